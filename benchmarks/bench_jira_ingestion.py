@@ -0,0 +1,51 @@
+"""
+Offline Jira ingestion benchmark.
+
+Replays a recording made with `python -m src.jira_replay --out <dir>` through a local
+stand-in server and measures extraction throughput for each page size / concurrency
+combination, optionally with injected latency and 429 throttling.
+
+    python -m benchmarks.bench_jira_ingestion --recording ./data/jira_recording \
+        --page-sizes 50,100 --concurrency 1,4,8 --latency 0.3 --throttle-rate 0.05
+"""
+import argparse
+import logging
+import time
+
+from jira import JIRA
+
+import src.jira_extractor as jira_extractor
+from src.jira_pagination import AdaptiveRateLimiter
+from src.jira_replay import ReplayJiraServer
+
+
+def run(recording: str, page_size: int, concurrency: int, latency: float, throttle_rate: float) -> dict:
+    server = ReplayJiraServer.from_recording(recording, latency=latency, throttle_rate=throttle_rate,
+                                             retry_after=max(latency, 0.1))
+    with server:
+        jira_extractor.set_jira(JIRA(server=server.url, max_retries=0))
+        limiter = AdaptiveRateLimiter(initial_delay=0.1)
+        started = time.perf_counter()
+        issues = sum(len(page) for page in jira_extractor.iter_issues(
+            "replay", max_results=page_size, concurrency=concurrency, limiter=limiter))
+        elapsed = time.perf_counter() - started
+    return {"page_size": page_size, "concurrency": concurrency, "issues": issues, "seconds": elapsed,
+            "issues_per_s": issues / elapsed if elapsed else 0.0, "throttled": server.throttled}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Jira ingestion against a replayed recording")
+    parser.add_argument('--recording', required=True, help='Directory written by src.jira_replay')
+    parser.add_argument('--page-sizes', default="100", help='Comma-separated page sizes')
+    parser.add_argument('--concurrency', default="1,4", help='Comma-separated worker counts')
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds of latency per request')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Probability of a 429 per search')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"{'page':>6} {'workers':>8} {'issues':>8} {'seconds':>9} {'issues/s':>10} {'429s':>6}")
+    for page_size in map(int, args.page_sizes.split(",")):
+        for concurrency in map(int, args.concurrency.split(",")):
+            r = run(args.recording, page_size, concurrency, args.latency, args.throttle_rate)
+            print(f"{r['page_size']:>6} {r['concurrency']:>8} {r['issues']:>8} {r['seconds']:>9.2f} "
+                  f"{r['issues_per_s']:>10.1f} {r['throttled']:>6}")
@@ -0,0 +1,89 @@
+"""
+LLM output parser micro-benchmark.
+
+Parses a corpus of model answers with the previous regex parser and with
+`parse_problems`, and reports the time per answer, the problems found and the
+failure kinds. The corpus is a JSONL file of {"output": ...} lines; answers
+recorded in the LLM response cache can be used instead.
+
+    python -m benchmarks.bench_parse_llm_output --corpus benchmarks/data/llm_outputs.jsonl --repeat 2000
+    python -m benchmarks.bench_parse_llm_output --cache ./data/llm_cache.sqlite
+"""
+import argparse
+import collections
+import json
+import logging
+import re
+import sqlite3
+import time
+from typing import Dict, List
+
+from src.output_parser import parse_problems
+
+
+def legacy_parse_llm_output(output: str) -> List[Dict]:
+    """The parser `parse_problems` replaced (without its debug print): first JSON object, else regex fields."""
+    problems = []
+    try:
+        match = re.compile(r'{.*?}', re.DOTALL).search(output)
+        if not match:
+            matches = re.compile(r'"?Problem"?:.*?"?Severity"?:.*?"?Impact"?:.*?(?=\n|\n\n|$)',
+                                 re.DOTALL).findall(output)
+            if not matches:
+                raise ValueError("No Data array found in the output.")
+            for string_match in matches:
+                problems.append({
+                    "description": re.search(r"(?<=Problem:\s).*?(?=\s*Severity:)", string_match).group().strip() if re.search(r"(?<=Problem:\s).*?(?=\s*Severity:)", string_match) else "No problem description found",
+                    "severity": re.search(r"(?<=Severity:\s).*?(?=\s*Impact:)", string_match).group().strip() if re.search(r"(?<=Severity:\s).*?(?=\s*Impact:)", string_match) else "No severity found",
+                    "impact": re.search(r"(?<=Impact:\s).*", string_match).group().strip() if re.search(r"(?<=Impact:\s).*", string_match) else "No impact found"
+                })
+        else:
+            parsed_data = json.loads(match.group(0))
+            problems.append({
+                "description": parsed_data.get("Problem", "").strip(),
+                "severity": parsed_data.get("Severity", "").strip(),
+                "impact": parsed_data.get("Impact", "").strip()
+            })
+    except (json.JSONDecodeError, ValueError):
+        return problems
+    return problems
+
+
+def load_corpus(corpus: str = None, cache: str = None) -> List[str]:
+    if cache:
+        with sqlite3.connect(cache) as db:
+            return [generation["text"] for (generations,) in db.execute("SELECT generations FROM responses")
+                    for generation in json.loads(generations)]
+    with open(corpus) as f:
+        return [json.loads(line)["output"] for line in f if line.strip()]
+
+
+def run(name: str, parse, outputs: List[str], repeat: int) -> dict:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for output in outputs:
+            parse(output)
+    seconds = time.perf_counter() - started
+    results = [parse(output) for output in outputs]
+    return {"parser": name, "us_per_output": 1e6 * seconds / (repeat * len(outputs)),
+            "problems": sum(len(r) for r in results), "empty": sum(not r for r in results)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark LLM output parsing")
+    parser.add_argument('--corpus', default="benchmarks/data/llm_outputs.jsonl", help='JSONL of {"output": ...}')
+    parser.add_argument('--cache', help='LLM response cache (SQLite) to read recorded outputs from instead')
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    corpus = load_corpus(args.corpus, args.cache)
+    print(f"{len(corpus)} outputs")
+    print(f"{'parser':>8} {'us/output':>10} {'problems':>9} {'empty':>6}")
+    for name, parse in (("legacy", legacy_parse_llm_output), ("new", lambda o: parse_problems(o).problems)):
+        r = run(name, parse, corpus, args.repeat)
+        print(f"{r['parser']:>8} {r['us_per_output']:>10.1f} {r['problems']:>9} {r['empty']:>6}")
+
+    parsed = [parse_problems(output) for output in corpus]
+    print("repairs:", dict(collections.Counter(kind for p in parsed for kind in p.repairs)))
+    print("failures:", dict(collections.Counter(p.failure for p in parsed if p.failure)))
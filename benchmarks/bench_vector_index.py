@@ -0,0 +1,91 @@
+"""
+Vector store benchmark: Chroma against the in-process numpy backend.
+
+Builds each store from the same synthetic, clustered chunk vectors (no embedding
+model needed) and measures build time, per-query similarity_search latency and
+recall@k against an exact search.
+
+    python -m benchmarks.bench_vector_index --chunks 20000,100000 --dim 384 --queries 500
+"""
+import argparse
+import logging
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.vector_store import open_vector_store
+
+ADD_BATCH_SIZE = 5000
+
+
+class LookupEmbeddings(Embeddings):
+    """Embeds the synthetic texts "chunk-<i>" and "query-<i>" as precomputed vectors."""
+
+    def __init__(self, chunks: np.ndarray, queries: np.ndarray):
+        self.vectors = {"chunk": chunks, "query": queries}
+
+    def _vector(self, text: str) -> np.ndarray:
+        kind, index = text.split("-")
+        return self.vectors[kind][int(index)]
+
+    def embed_documents(self, texts):
+        return [self._vector(t).tolist() for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text).tolist()
+
+
+def synthetic_vectors(n_chunks: int, n_queries: int, dim: int, seed: int = 0):
+    """Unit vectors around sqrt(n) topic centres, like chunks of related issues."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(int(np.sqrt(n_chunks)), 1), dim))
+    chunks = centres[rng.integers(len(centres), size=n_chunks)] + 0.6 * rng.normal(size=(n_chunks, dim))
+    queries = chunks[rng.integers(n_chunks, size=n_queries)] + 0.3 * rng.normal(size=(n_queries, dim))
+    normalize = lambda m: (m / np.linalg.norm(m, axis=1, keepdims=True)).astype(np.float32)
+    return normalize(chunks), normalize(queries)
+
+
+def run(backend: str, chunks: np.ndarray, queries: np.ndarray, k: int, index_options: dict) -> dict:
+    embeddings = LookupEmbeddings(chunks, queries)
+    exact = np.argsort(-(queries @ chunks.T), axis=1)[:, :k]
+    with tempfile.TemporaryDirectory() as directory:
+        store = open_vector_store(embeddings, directory, "bench", backend, index_options)
+        texts = [f"chunk-{i}" for i in range(len(chunks))]
+        started = time.perf_counter()
+        batch = ADD_BATCH_SIZE if backend == "chroma" else len(texts)
+        for start in range(0, len(texts), batch):
+            store.add_texts(texts[start:start + batch], ids=texts[start:start + batch])
+        build_seconds = time.perf_counter() - started
+
+        hits, latencies = 0, []
+        for i, expected in enumerate(exact):
+            started = time.perf_counter()
+            found = store.similarity_search(f"query-{i}", k=k)
+            latencies.append(time.perf_counter() - started)
+            hits += len({int(d.id.split("-")[1]) for d in found} & set(expected.tolist()))
+    return {"backend": backend, "chunks": len(chunks), "build_s": build_seconds,
+            "p50_ms": 1000 * float(np.median(latencies)), "p95_ms": 1000 * float(np.percentile(latencies, 95)),
+            "recall": hits / (k * len(queries))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Chroma against the numpy vector store")
+    parser.add_argument('--chunks', default="10000,60000", help='Comma-separated corpus sizes')
+    parser.add_argument('--dim', type=int, default=384, help='Vector dimension (all-MiniLM-L6-v2: 384)')
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--ivf-threshold', type=int, default=50000)
+    parser.add_argument('--nprobe', type=int, default=8)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    options = {"ivf_threshold": args.ivf_threshold, "nprobe": args.nprobe}
+    print(f"{'backend':>8} {'chunks':>8} {'build s':>9} {'p50 ms':>8} {'p95 ms':>8} {f'recall@{args.k}':>9}")
+    for n_chunks in map(int, args.chunks.split(",")):
+        chunk_vectors, query_vectors = synthetic_vectors(n_chunks, args.queries, args.dim)
+        for backend in ("chroma", "numpy"):
+            r = run(backend, chunk_vectors, query_vectors, args.k, options)
+            print(f"{r['backend']:>8} {r['chunks']:>8} {r['build_s']:>9.2f} {r['p50_ms']:>8.2f} "
+                  f"{r['p95_ms']:>8.2f} {r['recall']:>9.3f}")
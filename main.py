@@ -1,19 +1,27 @@
 import logging
-import shutil
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
 from dotenv import load_dotenv
 import argparse  # Added for command-line argument parsing
 
 from langchain.chains import LLMChain
 from langchain_core.prompts import PromptTemplate
-from langchain_chroma import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
 
-from src.db.mongodb_client import connect_to_mongo, load_collection, insert_to_collection
+from src.db.mongodb_client import (connect_to_mongo, load_collection, insert_to_collection, BulkUpsertWriter,
+                                   ensure_indexes, report_collscans, report_slow_queries)
+from src.db.snapshot import load_collection_snapshot
 from src.preprocessing import clean_data
-from src.problem_extraction import standardize_problems
+from src.dedupe import collapse_duplicates, fan_out_problems
+from src.prompt_budget import PromptBudget, TokenCounter, prompt_token_limit
+from src.streaming import StreamStats, stream_until_complete
+from src.batch_extraction import format_batch_issues, parse_batch_output, plan_batches
+from src.output_parser import to_problem
+from src.vector_store import create_vector_store, similar_cases_for_keys
+from src.embedding_engine import embed_matrix
+from src.problem_extraction import load_processed_keys, pending_issues, standardize_problems
 from src.analysis import problem_frequency_analysis, generate_cluster_summary
 from src.reporting import generate_enhanced_report, generate_problem_report
 from src.llm_utils import parse_llm_output, setup_llm, setup_embeddings
@@ -25,34 +33,26 @@ import numpy as np
 import pandas as pd
 
 
+PROGRESS_INTERVAL = 10  # Seconds between stage-1 progress lines
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def create_vector_store(documents: List, embeddings) -> Chroma:
-    # Convert each string document into a Document object
-    document_objects = [Document(page_content=doc) for doc in documents]
-
-    """Create and populate vector store."""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    splits = text_splitter.split_documents(document_objects)
-
-    # Ensure the vector store directory is empty before creating a new one. Delete it.
-    persist_directory = Path("./data/vectorstore")
-    if persist_directory.exists():
-        logging.info("Removing existing vector store and its contents.")
-        shutil.rmtree(persist_directory)
-
-    return Chroma.from_documents(
-        documents=splits,
-        embedding=embeddings,
-        persist_directory=str(persist_directory)
-    )
+def pipeline_queries(config) -> Dict[str, List[Dict]]:
+    """Representative filters issued by the pipeline, explained at startup to catch missing indexes."""
+    jira_source = config["issue-extractor"]["jira_source"]
+    version = config["prompts"]["version"]
+    return {
+        config["mongodb"]["raw_collection"]: [{"jira_source": jira_source}],
+        config["mongodb"]["processed_collection"]: [
+            {"jira_source": jira_source, "version": version, "problem_type": {"$ne": "unknown"}},
+            {"description": "", "key": "", "jira_source": jira_source},
+            {"jira_source": jira_source},
+        ],
+    }
 
 
 def assess_optimal_n_clusters(embeddings: List[np.ndarray], max_clusters: int = 10) -> int:
@@ -145,67 +145,226 @@ def preprocess_clustered_problems(
     return pd.DataFrame(processed_data)
 
 
-def process_row(row, vector_store, llm, taxonomy, config, db):
-    """Process a single row of data."""
-    try:
-        # Check if the record already exists
+def invoke_prompt(prompt: PromptTemplate, inputs: Dict, llm, stream_stats: StreamStats = None,
+                  label: str = "", max_values: int = 1) -> str:
+    """
+    Runs a prompt. When `stream_stats` is given, the answer is streamed and stopped once
+    prose follows its JSON run of at least `max_values` objects.
+    """
+    if stream_stats is None:
+        return (prompt | llm).invoke(inputs)
+    return stream_until_complete(llm, prompt.format(**inputs), stream_stats, max_values, label)
 
-        existing_record = db[config["mongodb"]["processed_collection"]].find_one(
-            {
-                "key": row["key"], "version": config["prompts"]["version"], "problem_type": {"$ne": "unknown"}
-            }
-        )
-        if existing_record:
-            logging.info(f"Record with key {row['key']} and version {
-                         config['prompts']['version']} already exists. Skipping processing.")
-            return []
 
-        similar_docs = vector_store.similarity_search(row['description'], k=3)
-        similar_cases = "\n".join([d.page_content for d in similar_docs])
+def process_row(row, vector_store, llm, taxonomy, config, budget: PromptBudget = None,
+                similar_cases: List[str] = None, stream_stats: StreamStats = None):
+    """Process a single row of data, searching similar cases unless they were retrieved in advance."""
+    try:
+        if similar_cases is None:
+            similar_cases = [d.page_content for d in vector_store.similarity_search(row['description'], k=3)]
+        text, cases = row['description'], "\n".join(similar_cases)
+        if budget is not None:
+            text, cases, dropped = budget.fit(config["prompts"]["problem_extraction"], text, similar_cases)
+            if dropped:
+                logging.info(f"Prompt for {row['key']} over budget: dropped {dropped} tokens.")
 
         prompt = PromptTemplate(
             template=config["prompts"]["problem_extraction"],
             input_variables=["text", "similar_cases"]
         )
-        chain = prompt | llm
-        results = chain.invoke({
-            "text": row['description'],
-            "similar_cases": similar_cases
-        })
-        standardized_results = [standardize_problems(
-            result, taxonomy) for result in parse_llm_output(results)]
-        for result in standardized_results:
-            result["customer_id"] = row["cid"]
-            result["key"] = row["key"]
-            result["version"] = config["prompts"]["version"]
-        return standardized_results
+        results = invoke_prompt(prompt, {
+            "text": text,
+            "similar_cases": cases
+        }, llm, stream_stats, row['key'], config["llm"].get("streaming", {}).get("max_objects", 1))
+        return to_problem_documents(parse_llm_output(results), row, taxonomy, config)
     except Exception as e:
         logging.error(f"Error processing row: {e}", exc_info=True)
         return []
 
 
+def to_problem_documents(problems: List[Dict], row, taxonomy, config) -> List[Dict]:
+    """Standardizes parsed problems and tags them with the issue key, customer and prompt version."""
+    standardized_results = [standardize_problems(
+        result, taxonomy) for result in problems]
+    for result in standardized_results:
+        result["customer_id"] = row["cid"]
+        result["key"] = row["key"]
+        result["version"] = config["prompts"]["version"]
+    return standardized_results
+
+
+def process_batch(rows: List, vector_store, llm, taxonomy, config, budget: PromptBudget,
+                  similar_cases: Dict[str, List[str]], counter: TokenCounter,
+                  stream_stats: StreamStats = None) -> List[Tuple]:
+    """
+    Extracts the problems of several short issues with one `problem_extraction_batch` prompt.
+
+    Issues missing from the parsed response are extracted one by one with `process_row`.
+
+    Returns:
+        List[Tuple]: Each row with its problems, in the order of `rows`.
+    """
+    parsed = {}
+    try:
+        prompt = PromptTemplate(
+            template=config["prompts"]["problem_extraction_batch"],
+            input_variables=["issues"]
+        )
+        results = invoke_prompt(prompt, {
+            "issues": format_batch_issues(rows, similar_cases, counter,
+                                          config["batching"].get("similar_case_tokens", 100))
+        }, llm, stream_stats, f"batch of {len(rows)}", len(rows))  # Wait for an object per batched issue
+        parsed = parse_batch_output(results)
+    except Exception as e:
+        logging.error(f"Error processing batch of {len(rows)} issues: {e}", exc_info=True)
+
+    row_results, missing = [], []
+    for item_id, row in enumerate(rows, start=1):
+        if parsed.get(item_id):
+            problems = [to_problem(item) for item in parsed[item_id]]
+            row_results.append((row, to_problem_documents(problems, row, taxonomy, config)))
+        else:
+            missing.append(row["key"])
+            row_results.append((row, process_row(row, vector_store, llm, taxonomy, config, budget,
+                                                 similar_cases.get(row["key"]), stream_stats)))
+    if missing:
+        logging.warning(f"Batch of {len(rows)} issues returned nothing for {missing}; extracted them one by one.")
+    return row_results
+
+
+def plan_extraction_units(rows: List, budget: PromptBudget, config) -> List[List]:
+    """Packs short issues into batches when `batching` is enabled; otherwise every row is its own unit."""
+    batch_config = config.get("batching", {})
+    if not batch_config.get("enabled", False):
+        return [[row] for row in rows]
+    # The response must also fit: every batched issue needs about answer_tokens of output
+    max_items = min(batch_config.get("max_items", 8),
+                    config["llm"].get("max_tokens", 2000) // batch_config.get("answer_tokens", 120))
+    counter = extraction_counter(budget, config)
+    units = plan_batches(
+        rows, counter, config["prompts"]["problem_extraction_batch"],
+        prompt_token_limit(counter, config.get("prompt_budget", {})),
+        max_items=max_items,
+        short_issue_tokens=batch_config.get("short_issue_tokens", 300),
+        similar_case_tokens=batch_config.get("similar_case_tokens", 100))
+    batched = sum(len(unit) for unit in units if len(unit) > 1)
+    logging.info(f"Packed {batched} short issues into {sum(len(unit) > 1 for unit in units)} batch prompts; "
+                 f"{len(rows) - batched} issues are extracted one by one.")
+    return units
+
+
+def extraction_counter(budget: PromptBudget, config) -> TokenCounter:
+    """Token counter of the prompt budget, or one for its configured encoding when the budget is disabled."""
+    if budget is not None:
+        return budget.counter
+    options = config.get("prompt_budget", {})
+    return TokenCounter(options.get("encoding", "cl100k_base"), options.get("tokenizer"))
+
+
+def iter_row_results(rows: Iterable, extract: Callable, max_in_flight: int = 1) -> Iterator[Tuple]:
+    """
+    Applies `extract` to every row, with up to `max_in_flight` calls running concurrently.
+
+    Results are yielded in input order, so writes stay deterministic; a bounded
+    window of submitted rows keeps memory flat for large inputs.
+
+    Args:
+        rows (Iterable): Rows to process.
+        extract (Callable): Function called with each row.
+        max_in_flight (int): Maximum number of concurrent calls; 1 runs them serially.
+
+    Yields:
+        Tuple: Each row with its result.
+    """
+    if max_in_flight <= 1:
+        for row in rows:
+            yield row, extract(row)
+        return
+
+    rows = iter(rows)
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm") as pool:
+        pending = deque()
+
+        def submit_next() -> bool:
+            row = next(rows, None)
+            if row is None:
+                return False
+            pending.append((row, pool.submit(extract, row)))
+            return True
+
+        for _ in range(2 * max_in_flight):
+            if not submit_next():
+                break
+        try:
+            while pending:
+                row, future = pending.popleft()
+                result = future.result()
+                submit_next()
+                yield row, result
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
 def process_and_store_problems(cleaned_data, vector_store, llm, config, db):
     standardized_problems = []
-    for _, row in cleaned_data.iterrows():
-        if 'key' not in row:
-            logging.error(f"Missing 'key' in row: {row}")
-            continue
-        problems = process_row(row, vector_store, llm,
-                               config["taxonomy"], config, db)
-        for problem in problems:
-            standardized_problems.extend(problem)
-            db[config["mongodb"]["processed_collection"]].update_one(
-                # Match on unique description
-                {
-                    "description": problem["description"], 
-                    "key": problem["key"],
-                    "jira_source": config["issue-extractor"]["jira_source"]
-                },
-                {"$set": problem},  # Update with the full problem document
-                upsert=True  # Insert if not found
-            )
-        logging.info(f"Standardized problems {row['key']} saved or updated in MongoDB collection: {
-                     config['mongodb']['processed_collection']}")
+    if 'key' not in cleaned_data.columns:
+        logging.error(f"Missing 'key' column in cleaned data: {cleaned_data.columns}")
+        return standardized_problems
+
+    # Skip issues already extracted with this prompt version before any vector search or LLM call
+    pending_data = pending_issues(cleaned_data, load_processed_keys(db, config))
+    logging.info(f"{len(cleaned_data) - len(pending_data)} of {len(cleaned_data)} issues already processed "
+                 f"with prompt version {config['prompts']['version']}. Processing {len(pending_data)}.")
+
+    budget = PromptBudget.from_config(config)
+    # One batched pass over the stored chunk vectors instead of one query embedding and search per row
+    similar_cases = similar_cases_for_keys(vector_store, pending_data["key"].tolist(), k=3)
+    max_in_flight = config["llm"].get("max_in_flight", 1)
+    units = plan_extraction_units([row for _, row in pending_data.iterrows()], budget, config)
+    counter = extraction_counter(budget, config) if any(len(unit) > 1 for unit in units) else None
+
+    streaming_config = config["llm"].get("streaming", {})
+    stream_stats = StreamStats(streaming_config.get("sample_every", 20)) if streaming_config.get("enabled") else None
+
+    def extract(unit: List) -> List[Tuple]:
+        if len(unit) > 1:
+            return process_batch(unit, vector_store, llm, config["taxonomy"], config, budget, similar_cases,
+                                 counter, stream_stats)
+        return [(unit[0], process_row(unit[0], vector_store, llm, config["taxonomy"], config, budget,
+                                      similar_cases.get(unit[0]["key"]), stream_stats))]
+
+    done = 0
+    started = last_progress = time.perf_counter()
+    writer = BulkUpsertWriter.from_config(db[config["mongodb"]["processed_collection"]], config)
+    with writer:
+        for row, problems in (result for _, unit_results in iter_row_results(units, extract, max_in_flight)
+                              for result in unit_results):
+            done += 1
+            problems = fan_out_problems(problems, row)
+            for problem in problems:
+                standardized_problems.extend(problem)
+                writer.upsert(
+                    # Match on unique description
+                    {
+                        "description": problem["description"], 
+                        "key": problem["key"],
+                        "jira_source": config["issue-extractor"]["jira_source"]
+                    },
+                    # Update with the full problem document; updated_at marks the change for snapshots
+                    {"$set": problem, "$currentDate": {"updated_at": True}}
+                )
+            logging.info(f"Standardized problems {row['key']} queued for MongoDB collection: {
+                         config['mongodb']['processed_collection']}")
+            if time.perf_counter() - last_progress >= PROGRESS_INTERVAL or done == len(pending_data):
+                last_progress = time.perf_counter()
+                rate = done / max(last_progress - started, 1e-9)
+                logging.info(f"Extracted {done}/{len(pending_data)} issues ({rate:.2f} issues/s, "
+                             f"{max_in_flight} in flight, ~{(len(pending_data) - done) / rate:.0f}s left).")
+    logging.info(f"Stage 1 writes: {writer.totals['upserted']} upserted, {writer.totals['modified']} modified, "
+                 f"{writer.totals['errors']} errors.")
+    if stream_stats is not None:
+        stream_stats.log_summary()
     return standardized_problems
 
 
@@ -227,16 +386,42 @@ def main():
 
         # Connect to MongoDB
         db = connect_to_mongo(
-            config["mongodb"]["uri"], config["mongodb"]["database"])
-        raw_data = load_collection(db, config["mongodb"]["raw_collection"], query={
-                                   'jira_source': config["issue-extractor"]["jira_source"]})
+            config["mongodb"]["uri"], config["mongodb"]["database"], config["mongodb"].get("client"))
+        ensure_indexes(db, config)
+        report_collscans(db, pipeline_queries(config))
+        report_slow_queries(db, config["mongodb"].get("slow_query_ms", 100))
+        snapshot_config = config.get("snapshots", {})
 
         if args.stage == 1:
             logging.info("Starting stage 1")
+            raw_data = load_collection_snapshot(
+                db, config["mongodb"]["raw_collection"],
+                query={'jira_source': config["issue-extractor"]["jira_source"]},
+                projection=["key", "cid", "description"],
+                directory=snapshot_config.get("directory", "./data/snapshots"),
+                marker_field=snapshot_config.get("marker_fields", {}).get("raw_collection"),
+                content_hash=snapshot_config.get("content_hash", True))
 
             # Preprocess and create vector store
-            cleaned_data = clean_data(raw_data)
-            vector_store = create_vector_store(cleaned_data, embeddings)
+            cleaned_data = clean_data(
+                raw_data,
+                workers=config.get("preprocessing", {}).get("workers", 1),
+                chunk_size=config.get("preprocessing", {}).get("chunk_size", 20000))
+            dedupe_config = config.get("dedupe", {})
+            if dedupe_config.get("enabled", False):
+                # Only one representative per duplicate group is embedded and sent to the LLM
+                cleaned_data = collapse_duplicates(
+                    cleaned_data,
+                    max_distance=dedupe_config.get("max_hamming_distance", 3),
+                    shingle_size=dedupe_config.get("shingle_size", 3))
+            vector_store_config = config.get("vector_store", {})
+            vector_store = create_vector_store(
+                cleaned_data, embeddings,
+                persist_directory=vector_store_config.get("persist_directory", "./data/vectorstore"),
+                collection_name=vector_store_config.get("collection_name", "issues"),
+                incremental=vector_store_config.get("incremental", True),
+                backend=vector_store_config.get("backend", "chroma"),
+                index_options=vector_store_config.get("numpy"))
 
             # Process documents and extract problems
             standardized_problems = process_and_store_problems(
@@ -244,8 +429,13 @@ def main():
 
         if args.stage <= 2:
             # Load MongoDb Documents that were created in a previous code block to load all documents that exists in the collection
-            standardized_problems = load_collection(
-                db, config["mongodb"]["processed_collection"], query={"jira_source": config["issue-extractor"]["jira_source"]})
+            standardized_problems = load_collection_snapshot(
+                db, config["mongodb"]["processed_collection"],
+                query={"jira_source": config["issue-extractor"]["jira_source"]},
+                projection=["description", "problem_type", "key"],
+                directory=snapshot_config.get("directory", "./data/snapshots"),
+                marker_field=snapshot_config.get("marker_fields", {}).get("processed_collection"),
+                content_hash=snapshot_config.get("content_hash", True))
             logging.info(f"Number of Loaded Documents: {
                          len(standardized_problems)}")
 
@@ -258,7 +448,7 @@ def main():
                                  for item in standardized_problem_rows]
 
             # Generate embeddings for the descriptions
-            problem_embeddings = embeddings.embed_documents(descriptions_only)
+            problem_embeddings = embed_matrix(embeddings, descriptions_only)
 
             # Assess optimal number of clusters
             optimal_n_clusters = assess_optimal_n_clusters(
@@ -302,6 +492,8 @@ def main():
         )
 
         logging.info(f"Analysis complete - Report available at {output_path}")
+        if llm.cache is not None:
+            llm.cache.store.log_stats()
 
         return True
 
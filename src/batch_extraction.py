@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional
+
+from src.output_parser import iter_json_values, to_problem
+from src.prompt_budget import TokenCounter
+
+ITEM_OVERHEAD_TOKENS = 12  # "Case N:" and "Similar case for N:" labels of an item
+
+
+def plan_batches(rows: List, counter: TokenCounter, template: str, max_prompt_tokens: int,
+                 max_items: int = 8, short_issue_tokens: int = 300, similar_case_tokens: int = 100) -> List[List]:
+    """
+    Groups rows into extraction units, packing short issues into shared prompts.
+
+    Issues of up to `short_issue_tokens` are packed greedily, in order, while the
+    batch prompt stays within `max_prompt_tokens` and has at most `max_items` issues.
+    Longer issues get a unit of their own.
+
+    Args:
+        rows (List): Rows with a 'description'.
+        counter (TokenCounter): Token counter of the prompted model.
+        template (str): Batch prompt template; its fixed text counts against the budget.
+        max_prompt_tokens (int): Budget of one batch prompt.
+        max_items (int): Maximum issues per batch.
+        short_issue_tokens (int): Largest issue that is batched.
+        similar_case_tokens (int): Tokens of the similar case added to each issue.
+
+    Returns:
+        List[List]: Units of one or more rows, in input order of their first row.
+    """
+    units, batch, batch_tokens = [], [], 0
+    available = max_prompt_tokens - counter.count(template)
+    for row in rows:
+        tokens = counter.count(row["description"])
+        if max_items <= 1 or tokens > short_issue_tokens:
+            units.append([row])
+            continue
+        item_tokens = tokens + similar_case_tokens + ITEM_OVERHEAD_TOKENS
+        if batch and (len(batch) >= max_items or batch_tokens + item_tokens > available):
+            units.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(row)
+        batch_tokens += item_tokens
+    if batch:
+        units.append(batch)
+    return units
+
+
+def format_batch_issues(rows: List, similar_cases: Dict[str, List[str]], counter: TokenCounter,
+                        similar_case_tokens: int) -> str:
+    """Numbers the issues of a batch, each with its most similar case, for the batch prompt."""
+    blocks = []
+    for item_id, row in enumerate(rows, start=1):
+        block = f"Case {item_id}: {row['description']}"
+        cases = similar_cases.get(row["key"]) or []
+        if cases:
+            block += f"\nSimilar case for {item_id}: {counter.truncate(cases[0], similar_case_tokens)}"
+        blocks.append(block)
+    return "\n\n".join(blocks)
+
+
+def parse_batch_output(output: str) -> Dict[int, List[Dict]]:
+    """
+    Parses a batch response into the problems of each item ID.
+
+    Every JSON array or object in the output is decoded, malformed ones repaired
+    locally; objects without a numeric "ID" or without problem text are ignored,
+    so items the model skipped or mangled beyond repair are simply missing and
+    get extracted on their own.
+
+    Returns:
+        Dict[int, List[Dict]]: Raw problem objects by item ID.
+    """
+    by_id: Dict[int, List[Dict]] = {}
+    for value, _ in iter_json_values(output):
+        for item in value if isinstance(value, list) else [value]:
+            item_id = _item_id(item)
+            if item_id is not None and to_problem(item)["description"]:
+                by_id.setdefault(item_id, []).append(item)
+    return by_id
+
+
+def _item_id(item) -> Optional[int]:
+    if not isinstance(item, dict):
+        return None
+    try:
+        return int(item.get("ID", item.get("id")))
+    except (TypeError, ValueError):
+        return None
@@ -1,18 +1,240 @@
-from pymongo import MongoClient
+import logging
+import threading
+import time
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 import pandas as pd
 
-def connect_to_mongo(uri: str, database: str):
+# Process-wide clients keyed by URI; a MongoClient is thread-safe and pools its sockets
+_clients: Dict[str, MongoClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_mongo_client(uri: str, client_options: Optional[Dict] = None) -> MongoClient:
+    """
+    Returns the shared MongoClient for a URI, creating it on first use.
+
+    Args:
+        uri (str): MongoDB connection string.
+        client_options (Dict): MongoClient keyword options (maxPoolSize, timeouts, w, compressors...).
+            Only used when the client is created.
+
+    Returns:
+        MongoClient: The pooled client shared by every caller in the process.
+    """
+    with _clients_lock:
+        client = _clients.get(uri)
+        if client is None:
+            client = MongoClient(uri, **(client_options or {}))
+            _clients[uri] = client
+            logging.info(f"Created MongoDB client for {uri} with options {client_options or {}}")
+    return client
+
+
+def close_mongo_clients():
+    """Closes every shared client, e.g. at process shutdown."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def connect_to_mongo(uri: str, database: str, client_options: Optional[Dict] = None):
     """Establish a connection to MongoDB."""
-    client = MongoClient(uri)
+    client = get_mongo_client(uri, client_options)
     return client[database]
 
-def load_collection(db, collection_name: str, query="") -> pd.DataFrame:
-    """Loads data from a MongoDB collection into a DataFrame."""
+def load_collection(db, collection_name: str, query="", projection=None,
+                    batch_size: Optional[int] = None, chunksize: Optional[int] = None):
+    """
+    Loads data from a MongoDB collection into a DataFrame.
+
+    Args:
+        db: MongoDB database connection.
+        collection_name (str): Name of the collection to read.
+        query (dict): Filter for the documents to load.
+        projection (list | dict): Fields to load. A list of field names excludes `_id` unless it is listed.
+        batch_size (int): Number of documents the cursor fetches per round-trip.
+        chunksize (int): When set, return an iterator of DataFrames with at most this many rows.
+
+    Returns:
+        pd.DataFrame | Iterator[pd.DataFrame]: The loaded documents.
+    """
     collection = db[collection_name]
-    data = list(collection.find(query))
-    return pd.DataFrame(data)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection} | ({} if "_id" in projection else {"_id": 0})
+    cursor = collection.find(query or {}, projection)
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    if chunksize:
+        return _iter_chunks(cursor, chunksize)
+    return pd.DataFrame(list(cursor))
+
+
+def _iter_chunks(cursor, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Yields DataFrames of at most `chunksize` documents from a cursor."""
+    while True:
+        chunk = list(islice(cursor, chunksize))
+        if not chunk:
+            return
+        yield pd.DataFrame(chunk)
 
 def insert_to_collection(db, collection_name: str, data: pd.DataFrame):
     """Inserts a DataFrame into a MongoDB collection."""
     collection = db[collection_name]
     collection.insert_many(data.to_dict("records"))
+
+
+def ensure_indexes(db, config: Dict) -> List[str]:
+    """
+    Idempotently creates the indexes listed under `mongodb.indexes` in config.yaml.
+
+    Index specs are grouped by the config key naming the collection (e.g.
+    `raw_collection`). Each spec has a `fields` mapping of field to direction plus any
+    `create_index` options such as `unique`. Failures (e.g. duplicates blocking a unique
+    index) are logged and do not stop the pipeline.
+
+    Returns:
+        List[str]: Names of the indexes that exist after the bootstrap.
+    """
+    mongo_config = config["mongodb"]
+    created = []
+    for collection_key, specs in mongo_config.get("indexes", {}).items():
+        collection = db[mongo_config[collection_key]]
+        for spec in specs:
+            options = {k: v for k, v in spec.items() if k != "fields"}
+            keys = [(field, direction) for field, direction in spec["fields"].items()]
+            try:
+                created.append(collection.create_index(keys, **options))
+            except OperationFailure as e:
+                logging.error(f"Could not create index {keys} on {collection.name}: {e}")
+    logging.info(f"Ensured MongoDB indexes: {created}")
+    return created
+
+
+def _plan_stages(plan) -> Iterator[str]:
+    """Yields every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+
+def report_collscans(db, queries: Dict[str, List[Dict]]) -> List[Tuple[str, Dict]]:
+    """
+    Explains the given queries and warns about those that still scan the whole collection.
+
+    Args:
+        db: MongoDB database connection.
+        queries (Dict[str, List[Dict]]): Filters to check, by collection name.
+
+    Returns:
+        List[Tuple[str, Dict]]: (collection name, filter) pairs whose winning plan is a COLLSCAN.
+    """
+    collscans = []
+    for collection_name, filters in queries.items():
+        for query in filters:
+            plan = db[collection_name].find(query).explain().get("queryPlanner", {}).get("winningPlan", {})
+            if "COLLSCAN" in _plan_stages(plan):
+                collscans.append((collection_name, query))
+                logging.warning(f"Query on {collection_name} falls back to COLLSCAN: {query}")
+    return collscans
+
+
+def report_slow_queries(db, slow_ms: int = 100, limit: int = 20) -> List[Dict]:
+    """
+    Lists profiled operations slower than `slow_ms` that used a collection scan.
+
+    Requires the database profiler to be enabled (e.g. `db.setProfilingLevel(1)`);
+    returns an empty list otherwise.
+    """
+    try:
+        entries = list(db["system.profile"].find(
+            {"millis": {"$gte": slow_ms}, "planSummary": {"$regex": "^COLLSCAN"}},
+            {"ns": 1, "millis": 1, "command": 1, "planSummary": 1}
+        ).sort("ts", -1).limit(limit))
+    except OperationFailure as e:
+        logging.info(f"MongoDB profiler data unavailable: {e}")
+        return []
+    for entry in entries:
+        logging.warning(f"Slow COLLSCAN on {entry.get('ns')} ({entry.get('millis')} ms): {entry.get('command')}")
+    return entries
+
+
+class BulkUpsertWriter:
+    """
+    Buffers upserts and writes them to a collection as unordered bulk writes.
+
+    A batch is flushed once it holds `batch_size` operations or `flush_interval`
+    seconds have passed since the previous flush. Use it as a context manager so
+    the last partial batch is flushed on exit.
+    """
+
+    def __init__(self, collection, batch_size: int = 500, flush_interval: float = 5.0):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.totals = {"upserted": 0, "modified": 0, "matched": 0, "errors": 0}
+        self._operations = []
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def from_config(cls, collection, config: Dict) -> "BulkUpsertWriter":
+        """Builds a writer using the `mongodb.bulk_batch_size` and `mongodb.bulk_flush_interval` settings."""
+        mongo_config = config.get("mongodb", {})
+        return cls(
+            collection,
+            batch_size=mongo_config.get("bulk_batch_size", 500),
+            flush_interval=mongo_config.get("bulk_flush_interval", 5.0)
+        )
+
+    def upsert(self, filter: Dict, update: Dict):
+        """Queues an upsert, flushing the buffer when it is full or stale."""
+        self._operations.append(UpdateOne(filter, update, upsert=True))
+        if (len(self._operations) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Writes the buffered upserts in one unordered bulk write.
+
+        Returns:
+            Dict[str, int]: Upserted, modified, matched and failed operation counts of the batch.
+        """
+        operations, self._operations = self._operations, []
+        self._last_flush = time.monotonic()
+        counts = {"upserted": 0, "modified": 0, "matched": 0, "errors": 0}
+        if not operations:
+            return counts
+
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            counts.update(upserted=result.upserted_count, modified=result.modified_count,
+                          matched=result.matched_count)
+        except BulkWriteError as e:
+            # Unordered writes carry on past failures; report what did get written
+            details = e.details
+            counts.update(upserted=details.get("nUpserted", 0), modified=details.get("nModified", 0),
+                          matched=details.get("nMatched", 0), errors=len(details.get("writeErrors", [])))
+            logging.error(f"Bulk write to {self.collection.name} had {counts['errors']} errors: "
+                          f"{details.get('writeErrors', [])[:3]}")
+
+        for name, value in counts.items():
+            self.totals[name] += value
+        logging.info(f"Bulk wrote {len(operations)} operations to {self.collection.name}: "
+                     f"{counts['upserted']} upserted, {counts['modified']} modified, {counts['errors']} errors.")
+        return counts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+from pymongo.errors import OperationFailure
+
+from src.db.mongodb_client import load_collection
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # Snapshots are an optimisation; without pyarrow every load goes to MongoDB
+    pa = None
+    feather = None
+
+
+def snapshot_key(collection_name: str, query: Optional[Dict], projection=None) -> str:
+    """Stable identifier of a collection extract, derived from the collection, query and projection."""
+    spec = json.dumps([collection_name, query or {}, projection], sort_keys=True, default=str)
+    return f"{collection_name}-{hashlib.sha1(spec.encode()).hexdigest()[:16]}"
+
+
+def collection_marker(db, collection_name: str, query: Optional[Dict], marker_field: Optional[str],
+                      content_hash: bool = True) -> Dict:
+    """
+    Change marker of a collection extract.
+
+    The document count, max `_id` and max `marker_field` of the extract are answered
+    from indexes; they catch inserts, deletes and writers that maintain the marker
+    field. Writers that do not (other scripts, older data) are caught by the
+    `dbHash` of the whole collection, computed server-side without transferring
+    documents. Any change to the collection then invalidates its snapshots; set
+    `content_hash` to False to skip the hash on collections too large to read.
+    """
+    collection = db[collection_name]
+    marker = {"count": collection.count_documents(query or {})}
+    latest = list(collection.find(query or {}, {"_id": 1}).sort("_id", -1).limit(1))
+    marker["max_id"] = str(latest[0]["_id"]) if latest else None
+    if marker_field:
+        latest = list(collection.find({**(query or {}), marker_field: {"$exists": True}}, {marker_field: 1, "_id": 0})
+                      .sort(marker_field, -1).limit(1))
+        marker["max"] = str(latest[0][marker_field]) if latest else None
+    if content_hash:
+        try:
+            marker["hash"] = db.command("dbHash", collections=[collection_name])["collections"].get(collection_name)
+        except OperationFailure as e:
+            logging.warning(f"dbHash of {collection_name} unavailable; relying on count and max markers: {e}")
+    return marker
+
+
+def _to_arrow_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts BSON-only values (ObjectId) to strings so the frame can be written as Arrow."""
+    if "_id" in df.columns:
+        df = df.assign(_id=df["_id"].astype(str))
+    return df
+
+
+def load_collection_snapshot(db, collection_name: str, query: Optional[Dict] = None, projection=None,
+                             directory: str = "./data/snapshots", marker_field: Optional[str] = None,
+                             content_hash: bool = True) -> pd.DataFrame:
+    """
+    Loads a collection extract from a local Arrow snapshot when the collection has not changed.
+
+    The snapshot is keyed by collection, query and projection, and is reused while the
+    marker (see `collection_marker`) matches the one stored with it.
+    Otherwise the extract is read from MongoDB and the snapshot is rewritten. Snapshots
+    are uncompressed Arrow IPC files read through a memory map.
+
+    Args:
+        db: MongoDB database connection.
+        collection_name (str): Name of the collection to read.
+        query (dict): Filter for the documents to load.
+        projection (list | dict): Fields to load, as for `load_collection`.
+        directory (str): Directory holding the snapshots.
+        marker_field (str): Field whose maximum changes whenever documents are written.
+        content_hash (bool): Also compare the collection's `dbHash`.
+
+    Returns:
+        pd.DataFrame: The loaded documents.
+    """
+    if pa is None:
+        logging.info("pyarrow is not installed; loading directly from MongoDB.")
+        return load_collection(db, collection_name, query=query, projection=projection)
+
+    base = Path(directory) / snapshot_key(collection_name, query, projection)
+    data_path, marker_path = base.with_suffix(".arrow"), base.with_suffix(".json")
+    marker = collection_marker(db, collection_name, query, marker_field, content_hash)
+
+    if data_path.exists() and marker_path.exists():
+        with open(marker_path) as f:
+            if json.load(f) == marker:
+                logging.info(f"Loading {collection_name} from snapshot {data_path}.")
+                return feather.read_table(data_path, memory_map=True).to_pandas()
+
+    df = load_collection(db, collection_name, query=query, projection=projection)
+    try:
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = data_path.with_suffix(".arrow.tmp")
+        feather.write_feather(_to_arrow_frame(df), tmp_path, compression="uncompressed")
+        os.replace(tmp_path, data_path)
+        with open(marker_path, "w") as f:
+            json.dump(marker, f)
+        logging.info(f"Wrote snapshot of {len(df)} {collection_name} documents to {data_path}.")
+    except (pa.ArrowException, TypeError, ValueError) as e:
+        logging.warning(f"Could not snapshot {collection_name}: {e}")
+    return df
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+SIMHASH_BITS = 64
+BIT_POSITIONS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def content_hash(text: str) -> str:
+    """Hash identifying exact duplicate texts."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash of a text over its word shingles.
+
+    Texts that share most of their shingles get fingerprints that differ in only a
+    few bits, so near-duplicates can be found by Hamming distance.
+    """
+    words = text.split()
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64
+    )
+    bits = (hashes[:, None] >> BIT_POSITIONS) & np.uint64(1)
+    votes = 2 * bits.sum(axis=0, dtype=np.int64) - len(shingles)
+    return int(sum(1 << i for i in np.flatnonzero(votes > 0)))
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def near_duplicate_groups(fingerprints: List[int], max_distance: int) -> List[int]:
+    """
+    Groups SimHash fingerprints within `max_distance` bits of each other.
+
+    Fingerprints are split into `max_distance + 1` bands; by the pigeonhole principle two
+    fingerprints within the distance share at least one identical band, so only
+    fingerprints sharing a band bucket are compared.
+
+    Returns:
+        List[int]: Group id (index of the group's first member) for every fingerprint.
+    """
+    parent = list(range(len(fingerprints)))
+    bands = max_distance + 1
+    width = SIMHASH_BITS // bands
+    for band in range(bands):
+        shift = band * width
+        mask = (1 << (width if band < bands - 1 else SIMHASH_BITS - shift)) - 1
+        buckets = defaultdict(list)
+        for idx, fingerprint in enumerate(fingerprints):
+            buckets[(fingerprint >> shift) & mask].append(idx)
+        for members in buckets.values():
+            for pos, i in enumerate(members):
+                for j in members[pos + 1:]:
+                    if _find(parent, i) != _find(parent, j) and bin(fingerprints[i] ^ fingerprints[j]).count("1") <= max_distance:
+                        root_i, root_j = _find(parent, i), _find(parent, j)
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+    return [_find(parent, i) for i in range(len(fingerprints))]
+
+
+def collapse_duplicates(data: pd.DataFrame, max_distance: int = 3, shingle_size: int = 3,
+                        text_column: str = "description") -> pd.DataFrame:
+    """
+    Collapses exact and near-duplicate issues to one representative row per group.
+
+    Exact duplicates are grouped by content hash, then the distinct texts are grouped by
+    SimHash Hamming distance. The first issue of each group is kept and gets the keys
+    and customer ids of every member in `duplicate_keys` and `duplicate_cids`.
+
+    Args:
+        data (pd.DataFrame): Cleaned data with 'key' and `text_column` columns.
+        max_distance (int): Maximum SimHash Hamming distance of near-duplicates; 0 keeps only exact matches.
+        shingle_size (int): Words per shingle.
+        text_column (str): Column holding the text to compare.
+
+    Returns:
+        pd.DataFrame: One row per group.
+    """
+    if data.empty:
+        return data.assign(duplicate_keys=[], duplicate_cids=[])
+
+    texts = data[text_column].tolist()
+    hashes = [content_hash(text) for text in texts]
+    distinct = list(dict.fromkeys(hashes))
+    distinct_index = {h: i for i, h in enumerate(distinct)}
+    text_of = dict(zip(hashes, texts))
+
+    if max_distance > 0:
+        fingerprints = [simhash(text_of[h], shingle_size) for h in distinct]
+        distinct_group = near_duplicate_groups(fingerprints, max_distance)
+    else:
+        distinct_group = list(range(len(distinct)))
+    groups = [distinct_group[distinct_index[h]] for h in hashes]
+
+    cids = data["cid"].tolist() if "cid" in data.columns else [None] * len(data)
+    members: Dict[int, Dict[str, list]] = {}
+    representatives = []
+    for position, (group, key, cid) in enumerate(zip(groups, data["key"].tolist(), cids)):
+        if group not in members:
+            members[group] = {"keys": [], "cids": []}
+            representatives.append(position)
+        members[group]["keys"].append(key)
+        members[group]["cids"].append(cid)
+
+    collapsed = data.iloc[representatives].reset_index(drop=True)
+    rep_groups = [groups[position] for position in representatives]
+    collapsed["duplicate_keys"] = [members[group]["keys"] for group in rep_groups]
+    collapsed["duplicate_cids"] = [members[group]["cids"] for group in rep_groups]
+    logging.info(f"Collapsed {len(data)} issues into {len(collapsed)} groups "
+                 f"({len(data) - len(distinct)} exact and {len(distinct) - len(collapsed)} near-duplicates).")
+    return collapsed
+
+
+def fan_out_problems(problems: List[Dict], row) -> List[Dict]:
+    """
+    Copies the problems extracted for a representative row to every member of its group.
+
+    Args:
+        problems (List[Dict]): Problems extracted for the representative issue.
+        row: Collapsed row with `duplicate_keys` and `duplicate_cids`.
+
+    Returns:
+        List[Dict]: One problem per group member and extracted problem.
+    """
+    keys = row.get("duplicate_keys")
+    if not isinstance(keys, list) or len(keys) <= 1:
+        return problems
+    fanned_out = []
+    for problem in problems:
+        for key, cid in zip(keys, row["duplicate_cids"]):
+            fanned_out.append({**problem, "key": key, "customer_id": cid, "representative_key": row["key"]})
+    return fanned_out
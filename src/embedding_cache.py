@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.embedding_engine import embed_matrix
+
+LOOKUP_BATCH_SIZE = 500  # Keeps each lookup below SQLite's bound-parameter limit
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Persistent, content-addressed cache around an embedding model.
+
+    Vectors are stored as float32 blobs in SQLite, keyed by model name, kind
+    (document or query) and text hash, so cached texts never reach the model and
+    the cache is shared by every stage and run using the same model.
+
+    Args:
+        embeddings (Embeddings): Model computing the vectors on a cache miss.
+        model_name (str): Name of the model; part of every cache key.
+        path (str): SQLite file holding the cache.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, path: str = "./data/embedding_cache.sqlite"):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, kind TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, kind, hash)) WITHOUT ROWID"
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _lookup(self, kind: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+                rows = self._db.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND kind = ? "
+                    f"AND hash IN ({','.join('?' * len(batch))})",
+                    [self.model_name, kind, *batch]
+                )
+                found.update((h, np.frombuffer(vector, dtype=np.float32)) for h, vector in rows)
+        return found
+
+    def _store(self, kind: str, vectors: Dict[str, np.ndarray]):
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, kind, hash, vector) VALUES (?, ?, ?, ?)",
+                [(self.model_name, kind, h, np.asarray(v, dtype=np.float32).tobytes()) for h, v in vectors.items()]
+            )
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds documents as a matrix, computing only the cache misses.
+
+        Misses are embedded through the wrapped model's own matrix path (see
+        `embed_matrix`), so a cached `EmbeddingEngine` still hands back float32
+        rows without a round trip through Python lists.
+
+        Returns:
+            np.ndarray: C-contiguous float32 matrix with one row per text, in input order.
+        """
+        hashes = [text_hash(text) for text in texts]
+        cached = self._lookup("document", list(dict.fromkeys(hashes)))
+        missing = {h: text for h, text in zip(hashes, texts) if h not in cached}
+        if missing:
+            computed = dict(zip(missing, embed_matrix(self.embeddings, list(missing.values()))))
+            self._store("document", computed)
+            cached.update(computed)
+
+        hits = len(texts) - len(missing)
+        self.hits += hits
+        self.misses += len(missing)
+        logging.info(f"Embedding cache: {hits} of {len(texts)} documents cached, "
+                     f"{len(missing)} embedded (overall hit rate {self.hit_rate:.1%}).")
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.ascontiguousarray(np.stack([cached[h] for h in hashes]), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Float32 like cached vectors, so results do not depend on cache state
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        h = text_hash(text)
+        cached = self._lookup("query", [h])
+        if h in cached:
+            self.hits += 1
+            return cached[h].tolist()
+        self.misses += 1
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        self._store("query", {h: vector})
+        return vector.tolist()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
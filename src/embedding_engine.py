@@ -0,0 +1,126 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_worker_model = None  # Model of a pool worker process, loaded once by _init_worker
+
+
+def load_model(model_name: str, device: str = "cpu"):
+    """Loads a sentence-transformers model (the library behind HuggingFaceEmbeddings)."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+def _init_worker(model_name: str, device: str, threads: int):
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(threads)  # Workers share the cores instead of each using all of them
+    except ImportError:
+        pass
+    _worker_model = load_model(model_name, device)
+
+
+def _encode(model, texts: List[str], batch_size: int, normalize: bool) -> np.ndarray:
+    vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                           normalize_embeddings=normalize, show_progress_bar=False)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def _worker_encode(texts: List[str], batch_size: int, normalize: bool) -> np.ndarray:
+    return _encode(_worker_model, texts, batch_size, normalize)
+
+
+class EmbeddingEngine(Embeddings):
+    """
+    Batched embedding encoder returning contiguous float32 matrices.
+
+    Texts are sorted by length so each batch pads to similar lengths, then encoded
+    in `batch_size` batches, split across a pool of `workers` processes when there
+    are enough texts to keep every worker busy. The pool is started on first use and
+    reused until `close`.
+
+    Args:
+        model_name (str): sentence-transformers model name.
+        batch_size (int): Texts per forward pass.
+        workers (int): Worker processes; 1 encodes in the calling process.
+        normalize (bool): Scale vectors to unit length.
+        device (str): Torch device of the model.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 64, workers: int = 1,
+                 normalize: bool = True, device: str = "cpu"):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.workers = workers
+        self.normalize = normalize
+        self.device = device
+        self._model = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _local_encode(self, texts: List[str]) -> np.ndarray:
+        if self._model is None:
+            self._model = load_model(self.model_name, self.device)
+        return _encode(self._model, texts, self.batch_size, self.normalize)
+
+    def _pool_encode(self, texts: List[str]) -> np.ndarray:
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self.model_name, self.device, threads))
+        # Contiguous slices of the length-sorted texts, several per worker to balance the load
+        step = max(self.batch_size, -(-len(texts) // (self.workers * 4)))
+        parts = [texts[start:start + step] for start in range(0, len(texts), step)]
+        return np.concatenate(list(self._pool.map(
+            _worker_encode, parts, [self.batch_size] * len(parts), [self.normalize] * len(parts))))
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Encodes texts into a matrix.
+
+        Args:
+            texts (List[str]): Texts to encode.
+
+        Returns:
+            np.ndarray: C-contiguous float32 matrix with one row per text, in input order.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        started = time.perf_counter()
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        sorted_texts = [texts[i] for i in order]
+        if self.workers > 1 and len(texts) >= self.workers * self.batch_size:
+            encoded = self._pool_encode(sorted_texts)
+        else:
+            encoded = self._local_encode(sorted_texts)
+
+        matrix = np.empty_like(encoded, dtype=np.float32)
+        matrix[order] = encoded
+        elapsed = time.perf_counter() - started
+        if len(texts) > 1:
+            logging.info(f"Embedded {len(texts)} texts in {elapsed:.2f}s "
+                         f"({len(texts) / max(elapsed, 1e-9):.0f} texts/s).")
+        return matrix
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def embed_matrix(embeddings, texts: List[str]) -> np.ndarray:
+    """Embeds texts as a contiguous float32 matrix with any embeddings object."""
+    if hasattr(embeddings, "encode"):
+        return embeddings.encode(texts)
+    return np.ascontiguousarray(embeddings.embed_documents(texts), dtype=np.float32)
@@ -1,14 +1,26 @@
 import os
+import sys
+import argparse
 import pandas as pd
 import re
 from jira import JIRA
 import logging
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-import time
-from pymongo import MongoClient
-from utils import load_configuration
+
+if not __package__:
+    # Run as `python src/jira_extractor.py`: make the `src` package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import load_configuration
+from src.db.mongodb_client import BulkUpsertWriter, connect_to_mongo, ensure_indexes
+from src.jira_pagination import (AdaptiveRateLimiter, call_with_retry, fetch_page, iter_issue_pages,
+                                 iter_updated_pages)
+from src.jira_sync import (build_incremental_jql, keys_jql, load_sync_state, max_updated, order_by_created_key,
+                           reconcile_deleted_issues, save_watermark, sweep_due)
 
 CUSTOMER_CIDS = []  # List of customer IDs
+JIRA_SERVER = 'https://jira.camunda.com/'
 
 # Load environment variables
 load_dotenv()
@@ -16,25 +28,92 @@ load_dotenv()
 # Setup logging with more detail
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# MongoDB Connection Setup
-mongo_client = MongoClient('localhost', 27017)  # Update host and port if needed
-db = mongo_client['jira_data']  # Replace 'jira_data' with your database name
-collection = db['issues']  # Replace 'issues' with your collection name
-
-# Get Jira token from environment variables
-jira_token = os.getenv('JIRA_TOKEN')
-if not jira_token:
-    raise EnvironmentError('JIRA_TOKEN environment variable is not set.')
-
-# Connect to Jira with error handling
-try:
-    jira = JIRA(server='https://jira.camunda.com/', token_auth=jira_token)
-    logging.info("Successfully connected to Jira.")
-except Exception as e:
-    logging.error(f"Failed to connect to Jira: {e}")
-    raise
-
-def extract_issue_data(issue):
+# The Jira client is created on first use so the module can be imported (and pointed
+# at a replay server) without Jira credentials
+_jira = None
+
+
+def get_jira() -> JIRA:
+    """Returns the Jira client, connecting on first use."""
+    global _jira
+    if _jira is None:
+        # Get Jira token from environment variables
+        jira_token = os.getenv('JIRA_TOKEN')
+        if not jira_token:
+            raise EnvironmentError('JIRA_TOKEN environment variable is not set.')
+
+        # Connect to Jira with error handling
+        try:
+            # Retries are handled by the adaptive rate limiter so it can observe 429/Retry-After responses
+            _jira = JIRA(server=os.getenv('JIRA_SERVER', JIRA_SERVER), token_auth=jira_token, max_retries=0)
+            logging.info("Successfully connected to Jira.")
+        except Exception as e:
+            logging.error(f"Failed to connect to Jira: {e}")
+            raise
+    return _jira
+
+
+def set_jira(client: JIRA):
+    """Replaces the Jira client, e.g. with one connected to a `ReplayJiraServer`."""
+    global _jira
+    _jira = client
+
+
+def get_database(config):
+    """Returns the configured MongoDB database through the shared, pooled client."""
+    mongo_config = config["mongodb"]
+    return connect_to_mongo(mongo_config["uri"], mongo_config["database"], mongo_config.get("client"))
+
+
+# Jira fields read by extract_issue_data. Searches request only these instead of every
+# custom field; override with `issue-extractor.fields` when the mapping changes.
+ISSUE_FIELDS = [
+    "summary", "description", "status", "created", "updated", "components",
+    "issuetype", "priority", "labels", "customfield_11212", "comment",
+]
+# No expansions (changelog, renderedFields, ...) are mapped
+ISSUE_EXPAND = None
+
+
+def issue_comments(issue, limiter=None, page_size=100):
+    """
+    Returns all comments of an issue.
+
+    Search results embed only the first comments of an issue. When the inline
+    total says more exist, the comments are fetched separately page by page, with
+    the same throttling retries as search pages.
+
+    Args:
+        issue: Jira issue from a search result.
+        limiter (AdaptiveRateLimiter): Limiter pacing the extra requests.
+        page_size (int): Comments fetched per request.
+
+    Returns:
+        list: Jira comment resources.
+    """
+    inline = getattr(issue.fields, 'comment', None)
+    comments = list(getattr(inline, 'comments', []))
+    total = getattr(inline, 'total', len(comments))
+    if total <= len(comments):
+        return comments
+
+    limiter = limiter or AdaptiveRateLimiter()
+    comments = []
+    while len(comments) < total:
+        start_at = len(comments)
+        page = call_with_retry(
+            limiter,
+            lambda: get_jira().comments(issue.key, start_at=start_at, max_results=page_size),
+            f"comments of {issue.key} at {start_at}"
+        )
+        if not page:
+            break
+        comments.extend(page)
+    logging.info(f"Fetched {len(comments)} comments of {issue.key} in paged mode.")
+    return comments
+
+
+def extract_issue_data(issue, limiter=None, comment_page_size=100):
     try:
         # Extract comments as a list of dictionaries
         comments = [
@@ -43,7 +122,7 @@ def extract_issue_data(issue):
                 "body": re.sub(r"\[~[^\]]+\]", "[email]", comment.body),
                 "created": comment.created if hasattr(comment, "created") else None,
             }
-            for comment in getattr(issue.fields.comment, 'comments', [])
+            for comment in issue_comments(issue, limiter, comment_page_size)
         ]
         full_description = f"{issue.fields.description}\n\nComments:\n" + "\n".join(
             [f"Comment {idx + 1}: {c['body']}" for idx, c in enumerate(comments)]
@@ -74,54 +153,239 @@ def extract_issue_data(issue):
         return None
 
 # Step 1: Extract Issues with Additional Properties and Comments
-def extract_issues(jql_query, start_at=0, max_results=100):
-    data = []
+def iter_issues(jql_query, start_at=0, max_results=100, concurrency=1, limiter=None, jira_source=None,
+                fields=None, expand=ISSUE_EXPAND, comment_page_size=100, keyset=False, jira_timezone="UTC"):
+    """
+    Yields extracted issues one Jira page at a time.
 
-    while True:
-        try:
-            issues = jira.search_issues(jql_query, startAt=start_at, maxResults=max_results)
-            if not issues:
-                break
+    Only the pages buffered by the worker pool are held in memory, so callers can
+    stream arbitrarily large JQL results.
 
-            for issue in issues:
-                issue_data = extract_issue_data(issue)
-                issue_data['jira_source'] = jql_query
-                if issue_data:
-                    data.append(issue_data)
-            
-            logging.info(f"Extracted {len(issues)} issues from Jira, starting at {start_at}.")
-            start_at += max_results
-            time.sleep(1)  # Sleep to handle rate limiting
+    Args:
+        jql_query (str): JQL to search with.
+        start_at (int): Index of the first issue to fetch.
+        max_results (int): Page size.
+        concurrency (int): Number of `startAt` windows fetched in parallel.
+        limiter (AdaptiveRateLimiter): Limiter pacing the requests. A default one is created if omitted.
+        jira_source (str): Value stored in `jira_source`. Defaults to `jql_query`.
+        fields (List[str]): Jira fields to request. Defaults to `ISSUE_FIELDS`.
+        expand (str): Jira expansions to request.
+        comment_page_size (int): Page size used for issues whose comments are not all inline.
+        keyset (bool): Page sequentially by `updated` (see `iter_updated_pages`) instead of by
+            `startAt` windows, so issues updated during the run are never skipped. `start_at`
+            and `concurrency` are ignored.
+        jira_timezone (str): Timezone of the Jira user, used by keyset pagination.
 
-        except Exception as e:
-            logging.error(f"Error extracting issues at start {start_at}: {e}")
-            break
+    Yields:
+        List[Dict]: The `extract_issue_data` results of one page.
+    """
+    limiter = limiter or AdaptiveRateLimiter()
+    jira_source = jira_source or jql_query
+
+    if keyset:
+        pages = iter_updated_pages(get_jira(), jql_query, max_results=max_results, limiter=limiter,
+                                   jira_timezone=jira_timezone, fields=fields or ISSUE_FIELDS, expand=expand)
+    else:
+        pages = iter_issue_pages(get_jira(), jql_query, start_at=start_at, max_results=max_results,
+                                 concurrency=concurrency, limiter=limiter,
+                                 fields=fields or ISSUE_FIELDS, expand=expand)
+    for page_start, issues in pages:
+        page = []
+        for issue in issues:
+            issue_data = extract_issue_data(issue, limiter, comment_page_size)
+            if issue_data:
+                issue_data['jira_source'] = jira_source
+                page.append(issue_data)
+
+        logging.info(f"Extracted {len(issues)} issues from Jira, starting at {page_start} "
+                     f"(request delay {limiter.delay:.2f}s).")
+        yield page
+
+
+def extract_issues(jql_query, start_at=0, max_results=100, concurrency=1, limiter=None, jira_source=None):
+    """
+    Extracts all issues matching a JQL query into a DataFrame.
+
+    Prefer `ingest_issues` for large sources; this keeps every issue in memory.
+
+    Returns:
+        pd.DataFrame: One row per extracted issue.
+    """
+    data = []
+    try:
+        for page in iter_issues(jql_query, start_at=start_at, max_results=max_results,
+                                concurrency=concurrency, limiter=limiter, jira_source=jira_source):
+            data.extend(page)
+    except Exception as e:
+        logging.error(f"Error extracting issues for '{jql_query}': {e}")
 
     df = pd.DataFrame(data)    
     return df
 
+
+def ingest_issues(jql_query, writer, state_collection=None, jira_source=None, **kwargs):
+    """
+    Streams issues from Jira straight into MongoDB.
+
+    Every page is flushed through the bulk writer as soon as it is extracted. With
+    `keyset=True` (incremental syncs) pages are fetched by keyset pagination over
+    `updated` and, when a state collection is given, the watermark is advanced
+    after every page, so a run that dies midway resumes from the last written page.
+    Otherwise (full syncs, ordered by creation so updates do not shift the
+    concurrent `startAt` windows) the watermark is set to the start of the run once
+    it has completed, so the next incremental sync re-reads issues changed meanwhile.
+    A page with failed writes stops the run without moving the watermark. Failures
+    are read from the writer's totals, which also count the flushes `upsert`
+    triggers on its own.
+
+    Args:
+        jql_query (str): JQL to search with.
+        writer (BulkUpsertWriter): Writer for the raw issues collection.
+        state_collection: Sync state collection, or None to not track a watermark.
+        jira_source (str): Value stored in `jira_source`. Defaults to `jql_query`.
+        **kwargs: Paging options passed to `iter_issues`.
+
+    Returns:
+        int: Number of issues written.
+    """
+    jira_source = jira_source or jql_query
+    keyset = kwargs.get("keyset", False)
+    started = datetime.now(timezone.utc)
+    ingested = 0
+    try:
+        for page in iter_issues(jql_query, jira_source=jira_source, **kwargs):
+            errors_before = writer.totals["errors"]
+            for issue_data in page:
+                # Queue an upsert of the issue, matched by key
+                writer.upsert({'key': issue_data['key']}, {'$set': issue_data})
+            writer.flush()
+            errors = writer.totals["errors"] - errors_before
+            ingested += len(page) - errors
+            if errors:
+                logging.error(f"{errors} issues of a page failed to write; stopping the sync of "
+                              f"'{jira_source}' without advancing its watermark.")
+                break
+
+            watermark = max_updated(issue_data['updated_date'] for issue_data in page)
+            if keyset and state_collection is not None and watermark:
+                save_watermark(state_collection, jira_source, watermark)
+        else:
+            if not keyset and state_collection is not None:
+                save_watermark(state_collection, jira_source, started)
+    except Exception as e:
+        logging.error(f"Error ingesting issues for '{jql_query}' after {ingested} issues: {e}")
+    return ingested
+
+def fetch_issue_keys(jql_query, max_results=1000, concurrency=1, limiter=None):
+    """
+    Fetches only the keys of the issues matching a JQL query.
+
+    Errors are not swallowed: an incomplete key list must never be used to reconcile deletions.
+    Keys are listed in creation order, so issues created during the sweep are appended
+    instead of shifting the `startAt` windows. Deletions can still shift them, hence
+    the count check and `fetch_live_keys` before anything is removed.
+
+    Returns:
+        set: Issue keys currently matching the query.
+    """
+    keys, total = set(), None
+    for _, issues in iter_issue_pages(get_jira(), order_by_created_key(jql_query), max_results=max_results,
+                                      concurrency=concurrency, limiter=limiter or AdaptiveRateLimiter(),
+                                      fields=["key"]):
+        keys.update(issue.key for issue in issues)
+        total = getattr(issues, "total", total)
+    if total is not None and len(keys) != total:
+        logging.warning(f"Key sweep returned {len(keys)} keys but Jira reports {total} issues; "
+                        f"the source changed during the sweep.")
+    return keys
+
+
+def fetch_live_keys(jql_query, keys, chunk_size=100, limiter=None):
+    """
+    Returns the subset of `keys` that still match a JQL query.
+
+    Used to double-check stale keys before they are deleted. Query validation is
+    relaxed so keys of issues deleted in Jira are ignored instead of failing the search.
+
+    Returns:
+        set: Keys among `keys` currently matching the query.
+    """
+    limiter = limiter or AdaptiveRateLimiter()
+    keys = list(keys)
+    live = set()
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        issues = fetch_page(get_jira(), keys_jql(jql_query, chunk), 0, len(chunk), limiter,
+                            fields=["key"], validate_query=False)
+        live.update(issue.key for issue in issues)
+    return live
+
 # Main Execution Flow
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jira issue extractor")
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore the stored watermark and re-extract every issue of the source')
+    parser.add_argument('--sweep', action='store_true',
+                        help='Force a key-only sweep for issues deleted or moved out of the source')
+    args = parser.parse_args()
+
     # Load configuration
     config = load_configuration()
     cid = ''
-    issues_df=''
     # for cid in CUSTOMER_CIDS:
     jql_query = f'cid ~ {cid} and component in (C8-SM, C8-Distribution, C8-Zeebe, C8-Console)'
     jql_query = f'text ~ dynatrace and project = Support'
     jql_query = config["issue-extractor"]["jira_source"]
-    issues_df = extract_issues(jql_query)  
-    if not issues_df.empty:
-        for _, issue in issues_df.iterrows():
-            # Convert issue data to a dictionary
-            issue_data = issue.to_dict()
-
-            # Upsert each issue into MongoDB
-            collection.update_one(
-                {'key': issue_data['key']},  # Match issue by key
-                {'$set': issue_data},  # Update fields with new data
-                upsert=True  # Insert if it doesn't exist
-            )
-        logging.info(f"Upserted {len(issues_df)} issues into MongoDB for CID: {cid}.")
+    extractor_config = config["issue-extractor"]
+    sync_config = extractor_config.get("sync", {})
+    limiter = AdaptiveRateLimiter.from_config(config)
+    db = get_database(config)
+    ensure_indexes(db, config)
+    collection = db[config["mongodb"]["raw_collection"]]
+    state_collection = db[config["mongodb"]["sync_collection"]]
+
+    # Only fetch issues updated since the last sync unless a full extraction was requested
+    state = load_sync_state(state_collection, jql_query)
+    incremental = bool(state.get("watermark")) and not args.full
+    if incremental:
+        search_query = build_incremental_jql(
+            jql_query, state["watermark"],
+            jira_timezone=sync_config.get("jira_timezone", "UTC"),
+            overlap_minutes=sync_config.get("overlap_minutes", 5)
+        )
+        logging.info(f"Incremental sync of issues updated since {state['watermark']}.")
     else:
-        logging.info(f"No issues found for CID: {cid}.")
\ No newline at end of file
+        search_query = order_by_created_key(jql_query)
+        logging.info("Full sync of the Jira source.")
+
+    with BulkUpsertWriter.from_config(collection, config) as writer:
+        ingested = ingest_issues(
+            search_query,
+            writer,
+            state_collection=state_collection,
+            jira_source=jql_query,
+            max_results=extractor_config.get("page_size", 100),
+            concurrency=extractor_config.get("concurrency", 1),
+            limiter=limiter,
+            fields=extractor_config.get("fields"),
+            expand=extractor_config.get("expand"),
+            comment_page_size=extractor_config.get("comment_page_size", 100),
+            keyset=incremental,
+            jira_timezone=sync_config.get("jira_timezone", "UTC")
+        )
+    if ingested:
+        logging.info(f"Upserted {writer.totals['upserted']} and modified {writer.totals['modified']} "
+                     f"issues in MongoDB for CID: {cid}.")
+    else:
+        logging.info(f"No issues found for CID: {cid}.")
+
+    # Periodically reconcile issues that were deleted in Jira or no longer match the JQL
+    if args.full or args.sweep or sweep_due(state, sync_config.get("sweep_interval_hours", 24)):
+        live_keys = fetch_issue_keys(
+            jql_query,
+            max_results=sync_config.get("sweep_page_size", 1000),
+            concurrency=extractor_config.get("concurrency", 1),
+            limiter=limiter
+        )
+        reconcile_deleted_issues(collection, state_collection, jql_query, live_keys,
+                                 recheck=lambda keys: fetch_live_keys(jql_query, keys, limiter=limiter))
@@ -0,0 +1,272 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from jira.exceptions import JIRAError
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from src.jira_sync import order_by_updated_key, parse_jira_timestamp, updated_since_jql
+
+# Status codes Jira uses to ask clients to slow down
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class AdaptiveRateLimiter:
+    """
+    Paces Jira requests across worker threads.
+
+    The limiter keeps a delay between request start times. The delay shrinks while
+    responses come back faster than the target latency, grows when they are slow,
+    and jumps (honouring Retry-After) when Jira answers with 429/503.
+    """
+
+    def __init__(
+        self,
+        initial_delay: float = 0.5,
+        min_delay: float = 0.0,
+        max_delay: float = 30.0,
+        target_latency: float = 2.0,
+        speedup_factor: float = 0.8,
+        backoff_factor: float = 2.0,
+    ):
+        self.delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.target_latency = target_latency
+        self.speedup_factor = speedup_factor
+        self.backoff_factor = backoff_factor
+        self.throttled = 0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "AdaptiveRateLimiter":
+        """Builds a limiter from the `issue-extractor.rate_limit` config section."""
+        return cls(**config.get("issue-extractor", {}).get("rate_limit", {}))
+
+    def acquire(self):
+        """Blocks until the caller is allowed to start its next request."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    def record_success(self, latency: float):
+        """Adjusts the delay after a successful request that took `latency` seconds."""
+        with self._lock:
+            if latency <= self.target_latency:
+                self.delay = max(self.min_delay, self.delay * self.speedup_factor)
+            else:
+                self.delay = min(self.max_delay, max(self.delay, 0.1) * 1.5)
+
+    def record_throttle(self, retry_after: Optional[float] = None):
+        """Backs off after Jira throttled a request, pausing every worker for `retry_after` seconds."""
+        with self._lock:
+            self.throttled += 1
+            self.delay = min(self.max_delay, max(self.delay * self.backoff_factor, 0.5))
+            pause = retry_after if retry_after is not None else self.delay
+            self._next_slot = max(self._next_slot, time.monotonic() + pause)
+
+
+def _retry_after(error: JIRAError) -> Optional[float]:
+    """Reads the Retry-After header (in seconds) from a Jira error response, if present."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def call_with_retry(limiter: AdaptiveRateLimiter, request: Callable, description: str, max_retries: int = 5):
+    """
+    Runs a Jira request through the limiter, retrying throttled or dropped requests.
+
+    Args:
+        limiter (AdaptiveRateLimiter): Shared limiter pacing all requests.
+        request (Callable): Performs the request and returns its result.
+        description (str): What is being fetched, for log messages.
+        max_retries (int): How many throttled or dropped requests to retry before giving up.
+
+    Returns:
+        The result of `request`.
+    """
+    attempt = 0
+    while True:
+        limiter.acquire()
+        started = time.monotonic()
+        try:
+            result = request()
+        except JIRAError as e:
+            if e.status_code not in THROTTLE_STATUS_CODES or attempt >= max_retries:
+                raise
+            attempt += 1
+            retry_after = _retry_after(e)
+            limiter.record_throttle(retry_after)
+            logging.warning(f"Jira throttled {description} (HTTP {e.status_code}, Retry-After: {retry_after}). "
+                            f"Retry {attempt}/{max_retries}, delay now {limiter.delay:.2f}s.")
+            continue
+        except RequestsConnectionError as e:
+            if attempt >= max_retries:
+                raise
+            attempt += 1
+            limiter.record_throttle()
+            logging.warning(f"Connection error fetching {description}: {e}. Retry {attempt}/{max_retries}.")
+            continue
+        limiter.record_success(time.monotonic() - started)
+        return result
+
+
+def fetch_page(jira, jql_query: str, start_at: int, max_results: int,
+               limiter: AdaptiveRateLimiter, max_retries: int = 5, **search_kwargs):
+    """
+    Fetches a single `startAt` window from Jira, retrying throttled requests.
+
+    Args:
+        jira: Connected `jira.JIRA` client.
+        jql_query (str): JQL to search with.
+        start_at (int): Index of the first issue of the page.
+        max_results (int): Page size.
+        limiter (AdaptiveRateLimiter): Shared limiter pacing all requests.
+        max_retries (int): How many throttled or dropped requests to retry before giving up.
+        **search_kwargs: Extra arguments passed to `search_issues` (e.g. fields).
+
+    Returns:
+        ResultList: The issues of the page.
+    """
+    return call_with_retry(
+        limiter,
+        lambda: jira.search_issues(jql_query, startAt=start_at, maxResults=max_results, **search_kwargs),
+        f"page at {start_at}",
+        max_retries
+    )
+
+
+def iter_issue_pages(jira, jql_query: str, start_at: int = 0, max_results: int = 100,
+                     concurrency: int = 1, limiter: Optional[AdaptiveRateLimiter] = None,
+                     **search_kwargs) -> Iterator[Tuple[int, list]]:
+    """
+    Yields `(start_at, issues)` pages of a JQL search in `startAt` order.
+
+    The first page is fetched alone to learn the total. With `concurrency` > 1 the
+    remaining windows are fetched in parallel by a bounded worker pool; at most
+    `2 * concurrency` pages are in flight or buffered at any time.
+
+    Args:
+        jira: Connected `jira.JIRA` client.
+        jql_query (str): JQL to search with.
+        start_at (int): Index of the first issue to fetch.
+        max_results (int): Page size.
+        concurrency (int): Maximum number of parallel page requests.
+        limiter (AdaptiveRateLimiter): Limiter shared by all requests. A default one is created if omitted.
+        **search_kwargs: Extra arguments passed to `search_issues`.
+    """
+    limiter = limiter or AdaptiveRateLimiter()
+    first = fetch_page(jira, jql_query, start_at, max_results, limiter, **search_kwargs)
+    if not first:
+        return
+    yield start_at, first
+
+    total = getattr(first, "total", None)
+    if concurrency <= 1 or total is None:
+        start = start_at + max_results
+        while total is None or start < total:
+            issues = fetch_page(jira, jql_query, start, max_results, limiter, **search_kwargs)
+            if not issues:
+                break
+            yield start, issues
+            start += max_results
+        return
+
+    windows = iter(range(start_at + max_results, total, max_results))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="jira-page") as pool:
+        pending = deque()
+
+        def submit_next() -> bool:
+            start = next(windows, None)
+            if start is None:
+                return False
+            pending.append((start, pool.submit(
+                fetch_page, jira, jql_query, start, max_results, limiter, **search_kwargs)))
+            return True
+
+        for _ in range(2 * concurrency):
+            if not submit_next():
+                break
+        try:
+            while pending:
+                start, future = pending.popleft()
+                issues = future.result()
+                submit_next()
+                if issues:
+                    yield start, issues
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def iter_updated_pages(jira, jql_query: str, max_results: int = 100,
+                       limiter: Optional[AdaptiveRateLimiter] = None, jira_timezone: str = "UTC",
+                       **search_kwargs) -> Iterator[Tuple[int, list]]:
+    """
+    Yields pages of a JQL search in `updated` order using keyset pagination.
+
+    `startAt` windows over `ORDER BY updated` shift whenever an issue is updated
+    mid-run, silently dropping the issue at the next page boundary. Instead, every
+    page re-queries from the `updated` minute of the last issue seen, and issues
+    already returned with the same `updated` value are skipped. An issue updated
+    during the run is therefore returned again at the end rather than pushing
+    another one out. Only when a full page shares one minute does the search fall
+    back to offsets within that minute. Pages are fetched one after another.
+
+    Args:
+        jira: Connected `jira.JIRA` client.
+        jql_query (str): JQL to search with. Its ORDER BY clause is replaced.
+        max_results (int): Page size.
+        limiter (AdaptiveRateLimiter): Limiter pacing the requests. A default one is created if omitted.
+        jira_timezone (str): Timezone Jira interprets JQL timestamps in.
+        **search_kwargs: Extra arguments passed to `search_issues`.
+
+    Yields:
+        Tuple[int, list]: Number of issues yielded before the page, and the page's new issues.
+    """
+    limiter = limiter or AdaptiveRateLimiter()
+    fields = search_kwargs.get("fields")
+    if isinstance(fields, list) and "updated" not in fields:
+        search_kwargs["fields"] = fields + ["updated"]
+
+    seen = {}
+    cursor, offset, yielded = None, 0, 0
+    while True:
+        query = jql_query if cursor is None else updated_since_jql(jql_query, cursor, jira_timezone)
+        issues = fetch_page(jira, order_by_updated_key(query), offset, max_results, limiter, **search_kwargs)
+        if not issues:
+            return
+
+        fresh = [issue for issue in issues if seen.get(issue.key) != issue.fields.updated]
+        seen.update((issue.key, issue.fields.updated) for issue in fresh)
+        if fresh:
+            yield yielded, fresh
+            yielded += len(fresh)
+
+        total = getattr(issues, "total", None)
+        if total is not None and offset + len(issues) >= total:
+            return
+        last_updated = parse_jira_timestamp(issues[-1].fields.updated)
+        if last_updated is None:
+            raise ValueError(f"Cannot page past {issues[-1].key}: unparsable updated timestamp.")
+        next_cursor = last_updated.replace(second=0, microsecond=0)
+        if next_cursor == cursor:
+            offset += len(issues)
+        else:
+            cursor, offset = next_cursor, 0
+            # Issues updated before the cursor minute cannot come back
+            seen = {key: updated for key, updated in seen.items()
+                    if (parse_jira_timestamp(updated) or cursor) >= cursor}
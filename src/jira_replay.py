@@ -0,0 +1,282 @@
+import argparse
+import gzip
+import json
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from src.jira_pagination import AdaptiveRateLimiter, call_with_retry, fetch_page
+from src.jira_sync import JQL_TIMESTAMP_FORMAT, parse_jira_timestamp
+
+MANIFEST_FILE = "manifest.json"
+COMMENT_PATH = re.compile(r"^/rest/api/2/issue/([^/]+)/comment$")
+# JQL clauses the replay understands; everything else in the query is ignored
+UPDATED_SINCE = re.compile(r'updated\s*>=\s*"([^"]+)"', re.IGNORECASE)
+KEY_IN = re.compile(r"\bkey\s+in\s*\(([^)]*)\)", re.IGNORECASE)
+ORDER_BY_UPDATED = re.compile(r"ORDER\s+BY\s+updated\b", re.IGNORECASE)
+
+
+def _write_json_gz(path: Path, data):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def _read_json_gz(path: Path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_search_pages(jira, jql_query: str, directory: str, page_size: int = 100,
+                        fields: Optional[List[str]] = None, expand: Optional[str] = None,
+                        limiter: Optional[AdaptiveRateLimiter] = None) -> int:
+    """
+    Captures the raw `search_issues` pages of a JQL query to gzip-compressed JSON files.
+
+    Comment threads that are not fully inlined in the search results are recorded
+    as well, so the replay can serve the paged comment endpoint.
+
+    Args:
+        jira: Connected `jira.JIRA` client.
+        jql_query (str): JQL to record.
+        directory (str): Output directory for the recording.
+        page_size (int): Page size used while recording.
+        fields (List[str]): Jira fields to request. Defaults to all fields.
+        expand (str): Jira expansions to request.
+        limiter (AdaptiveRateLimiter): Limiter pacing the requests.
+
+    Returns:
+        int: Number of recorded issues.
+    """
+    out = Path(directory)
+    (out / "comments").mkdir(parents=True, exist_ok=True)
+    limiter = limiter or AdaptiveRateLimiter()
+
+    pages, start_at, total = [], 0, None
+    while total is None or start_at < total:
+        page = fetch_page(jira, jql_query, start_at, page_size, limiter,
+                          fields=fields or "*all", expand=expand, json_result=True)
+        issues = page.get("issues", [])
+        if not issues:
+            break
+        total = page.get("total", 0)
+        page_file = f"page-{start_at:07d}.json.gz"
+        _write_json_gz(out / page_file, page)
+        pages.append(page_file)
+
+        for issue in issues:
+            inline = issue.get("fields", {}).get("comment") or {}
+            if inline.get("total", 0) > len(inline.get("comments", [])):
+                thread = [comment.raw for comment in call_with_retry(
+                    limiter, lambda: jira.comments(issue["key"]), f"comments of {issue['key']}")]
+                _write_json_gz(out / "comments" / f"{issue['key']}.json.gz", thread)
+        logging.info(f"Recorded {len(issues)} issues starting at {start_at} of {total}.")
+        start_at += len(issues)
+
+    manifest = {"jql": jql_query, "page_size": page_size, "fields": fields, "expand": expand,
+                "total": start_at, "pages": pages, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(out / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+    logging.info(f"Recorded {start_at} issues to {out}.")
+    return start_at
+
+
+class ReplayJiraServer:
+    """
+    Local HTTP stand-in for the Jira REST endpoints used by the extractor.
+
+    Serves recorded (or synthetic) issues through `search`, honouring any `startAt`,
+    `maxResults` and `fields` combination, plus the paged comment endpoint. Of the
+    JQL only `updated >= "..."` (read as UTC), `key in (...)` and `ORDER BY updated`
+    are applied. Latency and 429 throttling can be injected to benchmark pagination
+    and retry behaviour. `issues` may be edited between requests to simulate changes.
+
+    Args:
+        issues (List[Dict]): Raw Jira issue payloads, in search order.
+        comments (Dict[str, List[Dict]]): Full comment threads by issue key.
+        latency (float): Seconds added to every search and comment request.
+        throttle_first (int): Number of initial search requests answered with 429.
+        throttle_rate (float): Probability of answering any later search request with 429.
+        throttle_comments_first (int): Number of initial comment requests answered with 429.
+        retry_after (float): Retry-After value sent with 429 responses.
+        max_page_size (int): Upper bound applied to `maxResults`, as Jira does.
+        seed (int): Seed for the throttling randomness.
+    """
+
+    def __init__(self, issues: List[Dict], comments: Optional[Dict[str, List[Dict]]] = None,
+                 latency: float = 0.0, throttle_first: int = 0, throttle_rate: float = 0.0,
+                 retry_after: float = 1.0, max_page_size: int = 1000, seed: int = 0,
+                 throttle_comments_first: int = 0):
+        self.issues = issues
+        self.comments = comments or {}
+        self.latency = latency
+        self.throttle_first = throttle_first
+        self.throttle_rate = throttle_rate
+        self.throttle_comments_first = throttle_comments_first
+        self.retry_after = retry_after
+        self.max_page_size = max_page_size
+        self.search_requests = []
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @classmethod
+    def from_recording(cls, directory: str, **kwargs) -> "ReplayJiraServer":
+        """Creates a server replaying a recording made by `record_search_pages`."""
+        path = Path(directory)
+        with open(path / MANIFEST_FILE) as f:
+            manifest = json.load(f)
+        issues = []
+        for page_file in manifest["pages"]:
+            issues.extend(_read_json_gz(path / page_file)["issues"])
+        comments = {p.name[:-len(".json.gz")]: _read_json_gz(p) for p in (path / "comments").glob("*.json.gz")}
+        return cls(issues, comments, **kwargs)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "ReplayJiraServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_throttle(self) -> bool:
+        with self._lock:
+            if self.throttle_first > 0:
+                self.throttle_first -= 1
+                throttle = True
+            else:
+                throttle = self.throttle_rate > 0 and self._random.random() < self.throttle_rate
+            self.throttled += throttle
+            return throttle
+
+    def _should_throttle_comments(self) -> bool:
+        with self._lock:
+            throttle = self.throttle_comments_first > 0
+            if throttle:
+                self.throttle_comments_first -= 1
+            self.throttled += throttle
+            return throttle
+
+    def _search(self, params: Dict) -> Dict:
+        start_at = int(params.get("startAt", ["0"])[0])
+        max_results = min(int(params.get("maxResults", ["50"])[0]), self.max_page_size)
+        fields = set(",".join(params.get("fields", ["*all"])).split(","))
+        jql = params.get("jql", [""])[0]
+        with self._lock:
+            self.search_requests.append(start_at)
+
+        matching = self._filter(jql)
+        issues = matching[start_at:start_at + max_results]
+        if "*all" not in fields:
+            issues = [dict(issue, fields={k: v for k, v in issue.get("fields", {}).items() if k in fields})
+                      for issue in issues]
+        return {"startAt": start_at, "maxResults": max_results, "total": len(matching), "issues": issues}
+
+    def _filter(self, jql: str) -> List[Dict]:
+        issues = list(self.issues)
+        since = UPDATED_SINCE.search(jql)
+        if since:
+            since = datetime.strptime(since.group(1), JQL_TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+            issues = [i for i in issues if parse_jira_timestamp(i.get("fields", {}).get("updated")) >= since]
+        keys = KEY_IN.search(jql)
+        if keys:
+            wanted = {key.strip().strip('"') for key in keys.group(1).split(",")}
+            issues = [i for i in issues if i["key"] in wanted]
+        if ORDER_BY_UPDATED.search(jql):
+            issues.sort(key=lambda i: parse_jira_timestamp(i.get("fields", {}).get("updated")))
+        return issues
+
+    def _comments(self, key: str, params: Dict) -> Dict:
+        thread = self.comments.get(key)
+        if thread is None:
+            issue = next((i for i in self.issues if i["key"] == key), {})
+            thread = (issue.get("fields", {}).get("comment") or {}).get("comments", [])
+        start_at = int(params.get("startAt", ["0"])[0])
+        max_results = int(params.get("maxResults", [str(len(thread) or 1)])[0])
+        return {"startAt": start_at, "maxResults": max_results, "total": len(thread),
+                "comments": thread[start_at:start_at + max_results]}
+
+    def _handler(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                if url.path == "/rest/api/2/serverInfo":
+                    return self._send(200, {"baseUrl": replay.url, "version": "9.12.0",
+                                            "versionNumbers": [9, 12, 0], "deploymentType": "Server"})
+                if url.path == "/rest/api/2/field":
+                    return self._send(200, [{"id": "customfield_11212", "name": "CID", "custom": True}])
+                if url.path == "/rest/api/2/search":
+                    if replay._should_throttle():
+                        return self._send(429, {"errorMessages": ["Rate limit exceeded"]},
+                                          {"Retry-After": str(replay.retry_after)})
+                    time.sleep(replay.latency)
+                    return self._send(200, replay._search(params))
+                comment_match = COMMENT_PATH.match(url.path)
+                if comment_match:
+                    if replay._should_throttle_comments():
+                        return self._send(429, {"errorMessages": ["Rate limit exceeded"]},
+                                          {"Retry-After": str(replay.retry_after)})
+                    time.sleep(replay.latency)
+                    return self._send(200, replay._comments(comment_match.group(1), params))
+                return self._send(404, {"errorMessages": [f"Unknown path {url.path}"]})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    from src.jira_extractor import ISSUE_FIELDS, get_jira
+    from src.utils import load_configuration
+
+    parser = argparse.ArgumentParser(description="Record Jira search pages for offline replay")
+    parser.add_argument('--out', default="./data/jira_recording", help='Directory to write the recording to')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--all-fields', action='store_true', help='Record every Jira field, not just ISSUE_FIELDS')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    config = load_configuration()
+    record_search_pages(
+        get_jira(),
+        config["issue-extractor"]["jira_source"],
+        args.out,
+        page_size=args.page_size,
+        fields=None if args.all_fields else ISSUE_FIELDS,
+        limiter=AdaptiveRateLimiter.from_config(config)
+    )
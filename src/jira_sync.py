@@ -0,0 +1,153 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+# Jira REST timestamps look like 2024-01-02T10:11:12.000+0100
+JIRA_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+# JQL only accepts minute precision and interprets it in the Jira user's timezone
+JQL_TIMESTAMP_FORMAT = "%Y/%m/%d %H:%M"
+
+ORDER_BY_PATTERN = re.compile(r"\s+ORDER\s+BY\s+.*$", re.IGNORECASE | re.DOTALL)
+
+
+def parse_jira_timestamp(value) -> Optional[datetime]:
+    """
+    Parses a Jira timestamp into a timezone-aware UTC datetime.
+
+    Args:
+        value (str | datetime): Timestamp as returned by the Jira REST API.
+
+    Returns:
+        datetime: UTC datetime, or None if the value cannot be parsed.
+    """
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.strptime(value, JIRA_TIMESTAMP_FORMAT).astimezone(timezone.utc)
+    except ValueError:
+        logging.warning(f"Unrecognised Jira timestamp: {value}")
+        return None
+
+
+def max_updated(values: Iterable) -> Optional[datetime]:
+    """Returns the latest parsable timestamp among `values`, or None."""
+    parsed = [ts for ts in (parse_jira_timestamp(v) for v in values) if ts is not None]
+    return max(parsed) if parsed else None
+
+
+def build_incremental_jql(jql_query: str, watermark: datetime, jira_timezone: str = "UTC",
+                          overlap_minutes: int = 5) -> str:
+    """
+    Restricts a JQL query to issues updated since the watermark.
+
+    The watermark is moved back by `overlap_minutes` because JQL only has minute
+    precision; re-fetching a few issues is harmless since writes are upserts.
+    Results are ordered by `updated` so a partially completed run never skips
+    older changes.
+
+    Args:
+        jql_query (str): Source JQL, as stored in `jira_source`.
+        watermark (datetime): Latest `updated` timestamp already synced.
+        jira_timezone (str): Timezone of the Jira user running the query.
+        overlap_minutes (int): Safety overlap applied to the watermark.
+
+    Returns:
+        str: JQL selecting only changed issues.
+    """
+    if watermark.tzinfo is None:
+        # MongoDB hands back naive datetimes that are UTC
+        watermark = watermark.replace(tzinfo=timezone.utc)
+    return order_by_updated(updated_since_jql(jql_query, watermark - timedelta(minutes=overlap_minutes),
+                                              jira_timezone))
+
+
+def updated_since_jql(jql_query: str, since: datetime, jira_timezone: str = "UTC") -> str:
+    """Restricts a JQL query (dropping its ORDER BY) to issues updated at or after the minute of `since`."""
+    since = since.astimezone(ZoneInfo(jira_timezone))
+    base_query = ORDER_BY_PATTERN.sub("", jql_query.strip())
+    return f'({base_query}) AND updated >= "{since.strftime(JQL_TIMESTAMP_FORMAT)}"'
+
+
+def order_by_updated(jql_query: str) -> str:
+    """Replaces any ORDER BY clause so issues come back oldest update first."""
+    return ORDER_BY_PATTERN.sub("", jql_query.strip()) + " ORDER BY updated ASC"
+
+
+def order_by_updated_key(jql_query: str) -> str:
+    """Like `order_by_updated`, with the key as tie-breaker so keyset pages are deterministic."""
+    return ORDER_BY_PATTERN.sub("", jql_query.strip()) + " ORDER BY updated ASC, key ASC"
+
+
+def order_by_created_key(jql_query: str) -> str:
+    """Replaces any ORDER BY clause with the append-only creation order used by key sweeps."""
+    return ORDER_BY_PATTERN.sub("", jql_query.strip()) + " ORDER BY created ASC, key ASC"
+
+
+def keys_jql(jql_query: str, keys: Iterable[str]) -> str:
+    """Restricts a JQL query (dropping its ORDER BY) to the given issue keys."""
+    base_query = ORDER_BY_PATTERN.sub("", jql_query.strip())
+    return f"({base_query}) AND key in ({', '.join(keys)})"
+
+
+def load_sync_state(state_collection, jira_source: str) -> Dict:
+    """Loads the sync state document for a Jira source (empty dict if it was never synced)."""
+    return state_collection.find_one({"jira_source": jira_source}) or {}
+
+
+def save_watermark(state_collection, jira_source: str, watermark: datetime):
+    """Advances the stored watermark for a Jira source; never moves it backwards."""
+    state_collection.update_one(
+        {"jira_source": jira_source},
+        {"$max": {"watermark": watermark}, "$set": {"synced_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+
+def sweep_due(state: Dict, interval_hours: float) -> bool:
+    """Tells whether the last key sweep for a source is older than `interval_hours`."""
+    last_sweep = state.get("last_sweep")
+    if last_sweep is None:
+        return True
+    if last_sweep.tzinfo is None:
+        last_sweep = last_sweep.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - last_sweep >= timedelta(hours=interval_hours)
+
+
+def reconcile_deleted_issues(collection, state_collection, jira_source: str, live_keys: Iterable[str],
+                             recheck: Optional[Callable[[List[str]], Iterable[str]]] = None) -> int:
+    """
+    Removes stored issues of a Jira source that no longer match its JQL.
+
+    Args:
+        collection: Raw issues collection.
+        state_collection: Collection holding the sync state.
+        jira_source (str): Source JQL the issues were extracted with.
+        live_keys (Iterable[str]): Keys currently returned by Jira for the source.
+        recheck (Callable): Given the stale keys, returns those that still match the source.
+            They are kept, so a key missed by the sweep is never deleted.
+
+    Returns:
+        int: Number of removed issues.
+    """
+    stored_keys = set(collection.distinct("key", {"jira_source": jira_source}))
+    stale_keys = sorted(stored_keys - set(live_keys))
+    if stale_keys and recheck is not None:
+        still_live = set(recheck(stale_keys))
+        if still_live:
+            logging.warning(f"{len(still_live)} issues missed by the key sweep of '{jira_source}' still exist; "
+                            f"keeping them.")
+        stale_keys = [key for key in stale_keys if key not in still_live]
+    deleted = 0
+    if stale_keys:
+        deleted = collection.delete_many({"jira_source": jira_source, "key": {"$in": stale_keys}}).deleted_count
+        logging.info(f"Removed {deleted} issues that were deleted or moved out of '{jira_source}'.")
+    state_collection.update_one(
+        {"jira_source": jira_source},
+        {"$set": {"last_sweep": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return deleted
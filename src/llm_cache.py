@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.outputs import Generation
+
+_caches: Dict[str, "SQLiteLRUCache"] = {}
+_caches_lock = threading.Lock()
+
+
+def prompt_fingerprint(prompt: str, llm_string: str) -> str:
+    """Cache key of a call: a hash of the rendered prompt and the serialized LLM parameters."""
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class SQLiteLRUCache(BaseCache):
+    """
+    Persistent LLM response cache with least-recently-used eviction.
+
+    Responses are stored in SQLite by `prompt_fingerprint`; once more than
+    `max_entries` are stored, the least recently read or written ones are evicted.
+    Hits, misses and evictions are counted for the run.
+
+    Args:
+        path (str): SQLite file holding the cache.
+        max_entries (int): Maximum number of cached responses.
+    """
+
+    def __init__(self, path: str = "./data/llm_cache.sqlite", max_entries: int = 50000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                         "key TEXT PRIMARY KEY, generations TEXT NOT NULL, last_used REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = prompt_fingerprint(prompt, llm_string)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT generations FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return [Generation(**generation) for generation in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        generations = json.dumps([{"text": g.text, "generation_info": g.generation_info} for g in return_val])
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO responses (key, generations, last_used) VALUES (?, ?, ?)",
+                             (prompt_fingerprint(prompt, llm_string), generations, time.time()))
+            excess = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._db.execute("DELETE FROM responses WHERE key IN "
+                                 "(SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,))
+                self.evictions += excess
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def log_stats(self):
+        logging.info(f"LLM cache: {self.hits} hits, {self.misses} misses ({self.hit_rate:.1%} hit rate), "
+                     f"{self.evictions} evictions, {len(self)} of {self.max_entries} entries.")
+
+
+class ScopedLLMCache(BaseCache):
+    """
+    View of a shared cache for one set of LLM parameters.
+
+    LangChain's `llm_string` for Ollama does not include the model name or the
+    sampling settings, so they are added to every key explicitly.
+
+    Args:
+        store (SQLiteLRUCache): Shared cache.
+        params (Dict): Parameters distinguishing the LLM, e.g. model, temperature and max_tokens.
+    """
+
+    def __init__(self, store: SQLiteLRUCache, params: Dict):
+        self.store = store
+        self.scope = json.dumps(params, sort_keys=True)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        return self.store.lookup(prompt, f"{self.scope}{llm_string}")
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.store.update(prompt, f"{self.scope}{llm_string}", return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+
+def get_llm_cache(params: Dict, path: str = "./data/llm_cache.sqlite", max_entries: int = 50000) -> ScopedLLMCache:
+    """
+    Returns the cache of an LLM with the given parameters.
+
+    The SQLite store at `path` is opened once per process, so every LLM and chain
+    shares it and its metrics.
+    """
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = SQLiteLRUCache(path, max_entries)
+        return ScopedLLMCache(_caches[path], params)
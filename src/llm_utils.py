@@ -1,57 +1,81 @@
 from langchain_ollama.llms import OllamaLLM
 from langchain_huggingface import HuggingFaceEmbeddings
+from src.embedding_cache import CachedEmbeddings
+from src.llm_cache import get_llm_cache
+from src.embedding_engine import EmbeddingEngine
+from src.onnx_embeddings import OnnxEmbeddings, export_onnx
+from src.output_parser import parse_problems
 from typing import List, Dict
 import logging
-import re
-import json
 
 def setup_llm(config: Dict, max_tokens=2000) -> OllamaLLM:
+    """Creates the Ollama LLM, sharing the persistent response cache when `llm.cache` is enabled."""
+    cache_config = config["llm"].get("cache", {})
+    cache = None
+    if cache_config.get("enabled", False):
+        params = {"model": config["llm"]["model_name"], "temperature": config["llm"]["temperature"],
+                  "max_tokens": max_tokens}
+        cache = get_llm_cache(params, cache_config.get("path", "./data/llm_cache.sqlite"),
+                              cache_config.get("max_entries", 50000))
     return OllamaLLM(
         model=config["llm"]["model_name"],
         temperature=config["llm"]["temperature"],
-        max_tokens=max_tokens
+        max_tokens=max_tokens,
+        cache=cache
     )
 
 def parse_llm_output(output: str) -> List[Dict]:
-    """Parse LLM output to extract problems, severity, and impact using regex."""
-    problems = []
-    parsed_data={}
-    try:
-        # Use regex to locate the JSON array in the output
-        json_pattern = re.compile(r'{.*?}', re.DOTALL)
-        match = json_pattern.search(output)
-        if not match:
-             # Use regex to locate the JSON-like structure in the output
-            json_pattern = re.compile(r'"?Problem"?:.*?"?Severity"?:.*?"?Impact"?:.*?(?=\n|\n\n|$)', re.DOTALL)
-            matches2 = json_pattern.findall(output)
-            if not matches2:
-                raise ValueError("No Data array found in the output.")            
-            for string_match in matches2:
-                # Add braces to ensure valid JSON
-                print ("match ",string_match)
-                problems.append({
-                    "description": re.search(r"(?<=Problem:\s).*?(?=\s*Severity:)", string_match).group().strip() if re.search(r"(?<=Problem:\s).*?(?=\s*Severity:)", string_match) else "No problem description found",
-                    "severity": re.search(r"(?<=Severity:\s).*?(?=\s*Impact:)", string_match).group().strip() if re.search(r"(?<=Severity:\s).*?(?=\s*Impact:)", string_match) else "No severity found",
-                    "impact": re.search(r"(?<=Impact:\s).*", string_match).group().strip() if re.search(r"(?<=Impact:\s).*", string_match) else "No impact found"
-                })
-        else:           
-            # Extract the JSON block
-            json_block = match.group(0)
-            parsed_data = json.loads(json_block)
+    """Parse LLM output into problems, severity and impact, repairing malformed JSON locally."""
+    parsed = parse_problems(output)
+    if parsed.repairs:
+        logging.info(f"Repaired LLM output locally: {', '.join(parsed.repairs)}.")
+    if parsed.failure:
+        logging.error(f"Error parsing LLM output ({parsed.failure}): {output}")
+    return parsed.problems
 
-            # Process each problem in the JSON list
-            problems.append({
-                "description": parsed_data.get("Problem", "").strip(),
-                "severity": parsed_data.get("Severity", "").strip(),
-                "impact": parsed_data.get("Impact", "").strip()
-            })
-    except (json.JSONDecodeError, ValueError) as e:       
-        logging.error(f"Error parsing LLM output JSON: {output} \n Exception: {str(e)}")
-        return problems  # Return an empty list if parsing fails
-    
-    return problems
+def setup_embeddings(config: Dict):
+    """
+    Creates the embedding model selected by `embeddings.backend`.
 
-def setup_embeddings(config: Dict) -> HuggingFaceEmbeddings:
-    return HuggingFaceEmbeddings(
-        model_name=config["embeddings"]["model_name"]
-    )
\ No newline at end of file
+    "engine" is the batched, multi-process float32 encoder, "onnx" the same model
+    exported to ONNX (int8 when `embeddings.onnx.quantize` is set) and run with ONNX
+    Runtime, and "huggingface" the plain LangChain wrapper. The model is wrapped in the persistent cache when
+    `embeddings.cache` is enabled; cache entries are kept apart per backend.
+    """
+    embedding_config = config["embeddings"]
+    backend = embedding_config.get("backend", "huggingface")
+    if backend == "engine":
+        embeddings = EmbeddingEngine(
+            embedding_config["model_name"],
+            batch_size=embedding_config.get("batch_size", 64),
+            workers=embedding_config.get("workers", 1),
+            normalize=embedding_config.get("normalize", True)
+        )
+        cache_name = f"{embedding_config['model_name']}:{backend}:{'normalized' if embeddings.normalize else 'raw'}"
+    elif backend == "onnx":
+        onnx_config = embedding_config.get("onnx", {})
+        quantize = onnx_config.get("quantize", True)
+        model_path = export_onnx(
+            onnx_config.get("export_model", f"sentence-transformers/{embedding_config['model_name']}"),
+            onnx_config.get("directory", "./data/onnx"), quantize)
+        embeddings = OnnxEmbeddings(
+            model_path,
+            batch_size=embedding_config.get("batch_size", 64),
+            normalize=embedding_config.get("normalize", True),
+            max_length=onnx_config.get("max_length", 256),
+            threads=onnx_config.get("threads", 0)
+        )
+        cache_name = (f"{embedding_config['model_name']}:{backend}{'-int8' if quantize else ''}:"
+                      f"{'normalized' if embeddings.normalize else 'raw'}")
+    elif backend == "huggingface":
+        embeddings = HuggingFaceEmbeddings(
+            model_name=embedding_config["model_name"]
+        )
+        cache_name = embedding_config["model_name"]
+    else:
+        raise ValueError(f"Unknown embeddings backend: {backend}")
+
+    cache_config = embedding_config.get("cache", {})
+    if cache_config.get("enabled", False):
+        return CachedEmbeddings(embeddings, cache_name, cache_config.get("path", "./data/embedding_cache.sqlite"))
+    return embeddings
\ No newline at end of file
@@ -0,0 +1,191 @@
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from src.embedding_engine import EmbeddingEngine
+
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+except ImportError:  # The ONNX backend is optional; the PyTorch backends work without it
+    ort = None
+    Tokenizer = None
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def export_onnx(model_name: str, directory: str, quantize: bool = True, opset: int = 17) -> Path:
+    """
+    Exports a Hugging Face encoder to ONNX, with an int8 dynamically quantized copy.
+
+    Needs torch, transformers and onnx, but only once; the exported files are
+    reused as long as they exist.
+
+    Args:
+        model_name (str): Hugging Face model name, e.g. "sentence-transformers/all-MiniLM-L6-v2".
+        directory (str): Output directory for the model and tokenizer files.
+        quantize (bool): Also write the int8 model.
+        opset (int): ONNX opset version.
+
+    Returns:
+        Path: The model file to run, quantized when `quantize` is set.
+    """
+    out = Path(directory)
+    model_path, quantized_path = out / MODEL_FILE, out / QUANTIZED_MODEL_FILE
+    if not model_path.exists():
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        out.mkdir(parents=True, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        input_names = list(sample.keys())
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(model, tuple(sample[name] for name in input_names), str(model_path),
+                              input_names=input_names, output_names=["last_hidden_state"],
+                              dynamic_axes=dynamic_axes, opset_version=opset)
+        tokenizer.save_pretrained(str(out))
+        logging.info(f"Exported {model_name} to {model_path}.")
+
+    if not quantize:
+        return model_path
+    if not quantized_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+        logging.info(f"Wrote int8 model to {quantized_path}.")
+    return quantized_path
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Averages token vectors over the unpadded positions, as sentence-transformers does."""
+    mask = attention_mask[:, :, None].astype(np.float32)
+    return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+class OnnxEmbeddings(EmbeddingEngine):
+    """
+    CPU embedding backend running an exported encoder with ONNX Runtime.
+
+    Tokenizes with the fast tokenizer saved by `export_onnx`, runs the (optionally
+    int8) model and mean-pools the token vectors, so it needs neither torch nor
+    transformers. Batching and length sorting are inherited from `EmbeddingEngine`;
+    ONNX Runtime parallelizes within the process, so no worker pool is used.
+
+    Args:
+        model_path (str): ONNX model file.
+        batch_size (int): Texts per inference call.
+        normalize (bool): Scale vectors to unit length.
+        max_length (int): Token limit per text; the model's maximum sequence length.
+        threads (int): ONNX Runtime intra-op threads; 0 uses all cores.
+    """
+
+    def __init__(self, model_path: str, batch_size: int = 64, normalize: bool = True,
+                 max_length: int = 256, threads: int = 0):
+        if ort is None:
+            raise ImportError("The onnx embeddings backend needs the onnxruntime and tokenizers packages.")
+        super().__init__(str(model_path), batch_size=batch_size, workers=1, normalize=normalize)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(str(Path(model_path).parent / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+
+    def _local_encode(self, texts: List[str]) -> np.ndarray:
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + self.batch_size])
+            inputs = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {k: v for k, v in inputs.items() if k in self.input_names})[0]
+            vectors = mean_pool(hidden, inputs["attention_mask"])
+            if self.normalize:
+                vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+            batches.append(vectors.astype(np.float32))
+        return np.concatenate(batches)
+
+
+def cosine_drift(vectors: np.ndarray, reference: np.ndarray) -> Dict[str, float]:
+    """
+    Compares two embeddings of the same texts row by row.
+
+    Returns:
+        Dict[str, float]: Mean and minimum cosine similarity, and the maximum drift (1 - cosine).
+    """
+    a = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    b = reference / np.clip(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12, None)
+    cosine = (a * b).sum(axis=1)
+    return {"mean_cosine": float(cosine.mean()), "min_cosine": float(cosine.min()),
+            "max_drift": float(1 - cosine.min())}
+
+
+def parity_check(candidate: EmbeddingEngine, reference: EmbeddingEngine, texts: List[str]) -> Dict[str, float]:
+    """
+    Reports the cosine drift and speed-up of a backend against the PyTorch reference.
+
+    Args:
+        candidate (EmbeddingEngine): Backend under test, e.g. `OnnxEmbeddings`.
+        reference (EmbeddingEngine): PyTorch engine of the same model.
+        texts (List[str]): Representative texts.
+
+    Returns:
+        Dict[str, float]: `cosine_drift` results plus both throughputs in texts per second.
+    """
+    timings = {}
+    vectors = {}
+    for name, engine in (("reference", reference), ("candidate", candidate)):
+        started = time.perf_counter()
+        vectors[name] = engine.encode(texts)
+        timings[name] = len(texts) / max(time.perf_counter() - started, 1e-9)
+
+    report = cosine_drift(vectors["candidate"], vectors["reference"])
+    report.update(reference_texts_per_s=timings["reference"], candidate_texts_per_s=timings["candidate"])
+    logging.info(f"Parity over {len(texts)} texts: mean cosine {report['mean_cosine']:.5f}, "
+                 f"max drift {report['max_drift']:.5f}, {timings['candidate'] / timings['reference']:.1f}x "
+                 f"throughput ({timings['candidate']:.0f} vs {timings['reference']:.0f} texts/s).")
+    return report
+
+
+if __name__ == "__main__":
+    from src.utils import load_configuration
+
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX and check parity")
+    parser.add_argument('--texts', help='File with one sample text per line (defaults to processed problems)')
+    parser.add_argument('--limit', type=int, default=2000, help='Maximum number of sample texts')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    config = load_configuration()
+    embedding_config = config["embeddings"]
+    onnx_config = embedding_config.get("onnx", {})
+    model_path = export_onnx(onnx_config.get("export_model", f"sentence-transformers/{embedding_config['model_name']}"),
+                             onnx_config.get("directory", "./data/onnx"), onnx_config.get("quantize", True))
+
+    if args.texts:
+        with open(args.texts) as f:
+            samples = [line.strip() for line in f if line.strip()][:args.limit]
+    else:
+        from src.db.mongodb_client import connect_to_mongo, load_collection
+        db = connect_to_mongo(config["mongodb"]["uri"], config["mongodb"]["database"], config["mongodb"].get("client"))
+        samples = load_collection(db, config["mongodb"]["processed_collection"],
+                                  projection=["description"])["description"].dropna().tolist()[:args.limit]
+
+    parity_check(
+        OnnxEmbeddings(model_path, batch_size=embedding_config.get("batch_size", 64),
+                       max_length=onnx_config.get("max_length", 256), threads=onnx_config.get("threads", 0)),
+        EmbeddingEngine(embedding_config["model_name"], batch_size=embedding_config.get("batch_size", 64)),
+        samples
+    )
@@ -0,0 +1,227 @@
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Failure kinds, from the most to the least specific
+TRUNCATED = "truncated"  # A JSON value was cut off, e.g. by max_tokens
+INVALID_JSON = "invalid_json"  # A complete value that does not decode: trailing commas, single quotes, bare keys
+MISSING_FIELDS = "missing_fields"  # Valid JSON without a "Problem"
+NO_JSON = "no_json"  # Neither JSON nor "Problem: ... Severity: ... Impact: ..." text
+
+JSON_START = re.compile(r"[\[{]")
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+UNQUOTED_KEY = re.compile(r"([{,]\s*)([A-Za-z_]\w*)\s*:")
+SINGLE_QUOTED = re.compile(r"'((?:[^'\\\n]|\\.)*)'")
+TEXT_PROBLEM = re.compile(
+    r'[*"]*Problem[*"]*\s*:(?P<problem>.*?)[*"]*Severity[*"]*\s*:(?P<severity>.*?)'
+    r'[*"]*Impact[*"]*\s*:(?P<impact>[^\n]*)', re.DOTALL)
+VALUE_PADDING = ' \t\r\n",*'
+
+_decoder = json.JSONDecoder()
+
+
+def _double_quoted(match: re.Match) -> str:
+    return json.dumps(match.group(1).replace("\\'", "'"))
+
+
+# Local repairs, applied cumulatively until the text decodes
+REPAIRS = (
+    lambda text: TRAILING_COMMA.sub(r"\1", text),
+    lambda text: UNQUOTED_KEY.sub(r'\1"\2":', text),
+    lambda text: SINGLE_QUOTED.sub(_double_quoted, text),
+)
+
+
+class ParsedOutput:
+    """
+    Problems found in an LLM answer, with how it had to be repaired.
+
+    Attributes:
+        problems (List[Dict]): Problems with "description", "severity" and "impact".
+        repairs (List[str]): Failure kinds of the values that were repaired locally.
+        failure (Optional[str]): Failure kind when no problem was found, else None.
+    """
+
+    def __init__(self, problems: List[Dict], repairs: List[str], failure: Optional[str]):
+        self.problems = problems
+        self.repairs = repairs
+        self.failure = failure
+
+
+def _span(text: str, start: int) -> Tuple[int, str, bool, Optional[Tuple[int, str]]]:
+    """
+    Finds the end of the bracketed value starting at `start`, outside JSON strings.
+
+    Returns:
+        Tuple: End of the value, the brackets left to close (empty when it is complete),
+        whether it ends inside a string, and the last comma with the brackets open there.
+    """
+    closers, in_string, escape, last_comma = [], False, False, None
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            closers.append("}")
+        elif char == "[":
+            closers.append("]")
+        elif char in "}]":
+            if char != closers.pop():
+                return i + 1, "", False, None  # Mismatched bracket; left to the repairs
+            if not closers:
+                return i + 1, "", False, None
+        elif char == ",":
+            last_comma = (i, "".join(reversed(closers)))
+    return len(text), "".join(reversed(closers)), in_string, last_comma
+
+
+def _decode(text: str) -> Optional[Any]:
+    for repair in (None,) + REPAIRS:
+        if repair is not None:
+            text = repair(text)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _repair_value(text: str, start: int) -> Tuple[Optional[Any], Optional[str], int]:
+    """
+    Repairs the malformed value at `start`.
+
+    Returns:
+        Tuple: The value (or None), its failure kind (None for bracketed prose without
+        a colon, which is not attempted) and its end.
+    """
+    end, closers, in_string, last_comma = _span(text, start)
+    if ":" not in text[start:end]:
+        return None, None, end
+    if not closers:
+        return _decode(text[start:end]), INVALID_JSON, end
+
+    # Close the cut-off value where it stops, else drop the element after its last comma
+    value = _decode(text[start:end] + ('"' if in_string else "") + closers)
+    if value is None and last_comma is not None:
+        value = _decode(text[start:last_comma[0]] + last_comma[1])
+    return value, TRUNCATED, end
+
+
+def iter_json_values(text: str) -> Iterator[Tuple[Optional[Any], Optional[str]]]:
+    """
+    Decodes every top-level JSON object and array in free text, in one pass.
+
+    Surrounding prose, numbering and code fences are skipped. Values that do not
+    decode are repaired locally: cut-off values are closed, and trailing commas,
+    bare keys and single quotes are fixed. Bracketed prose without a colon, such
+    as "[email]", is ignored.
+
+    Yields:
+        Tuple: The value and None; the repaired value and its failure kind; or
+        None and the failure kind of a value that could not be repaired.
+    """
+    pos = 0
+    while True:
+        match = JSON_START.search(text, pos)
+        if not match:
+            return
+        start = match.start()
+        try:
+            value, pos = _decoder.raw_decode(text, start)
+            yield value, None
+            continue
+        except json.JSONDecodeError:
+            pass
+        value, kind, end = _repair_value(text, start)
+        if value is not None:
+            pos = end
+            yield value, kind
+        else:
+            # Nested values may still decode on their own
+            pos = start + 1
+            if kind is not None:
+                yield None, kind
+
+
+def _lowered(item: Dict) -> Dict:
+    return {str(key).strip().lower(): value for key, value in item.items()}
+
+
+def _text(fields: Dict, *names: str) -> str:
+    for name in names:
+        if fields.get(name) is not None:
+            return str(fields[name]).strip()
+    return ""
+
+
+def _to_problem(fields: Dict) -> Dict:
+    return {
+        "description": _text(fields, "problem", "description"),
+        "severity": _text(fields, "severity"),
+        "impact": _text(fields, "impact")
+    }
+
+
+def to_problem(item: Dict) -> Dict:
+    """Maps a raw problem object to "description", "severity" and "impact"; keys are matched case-insensitively."""
+    return _to_problem(_lowered(item))
+
+
+def _problem_fields(value) -> Iterator[Dict]:
+    """Lower-cased problem objects in a decoded value, including lists of them wrapped in another object."""
+    if isinstance(value, dict):
+        fields = _lowered(value)
+        if _text(fields, "problem", "description"):
+            yield fields
+            return
+        value = [nested for nested in value.values() if isinstance(nested, (dict, list))]
+    if isinstance(value, list):
+        for nested in value:
+            yield from _problem_fields(nested)
+
+
+def parse_problems(output: str) -> ParsedOutput:
+    """
+    Extracts every problem from an LLM answer, repairing malformed JSON locally.
+
+    All JSON objects and arrays in the answer are decoded (see `iter_json_values`).
+    Without a problem among them, "Problem: ... Severity: ... Impact: ..." text is
+    parsed instead. When nothing is found, the failure is classified, so a
+    recurring kind can be fixed in the prompt or the repairs.
+
+    Args:
+        output (str): Raw model answer.
+
+    Returns:
+        ParsedOutput: The problems, the repairs made and the failure kind.
+    """
+    problems, repairs, failures, decoded = [], [], [], False
+    for value, kind in iter_json_values(output):
+        if value is None:
+            failures.append(kind)
+            continue
+        items = list(_problem_fields(value))
+        if kind is not None and items:
+            repairs.append(kind)
+        decoded = decoded or isinstance(value, dict) or any(isinstance(v, dict) for v in value)
+        problems.extend(_to_problem(fields) for fields in items)
+
+    if not problems:
+        problems = [{
+            "description": match.group("problem").strip(VALUE_PADDING),
+            "severity": match.group("severity").strip(VALUE_PADDING),
+            "impact": match.group("impact").strip(VALUE_PADDING)
+        } for match in TEXT_PROBLEM.finditer(output)]
+    if problems:
+        return ParsedOutput(problems, repairs, None)
+    for kind in (TRUNCATED, INVALID_JSON):
+        if kind in failures:
+            return ParsedOutput([], repairs, kind)
+    return ParsedOutput([], repairs, MISSING_FIELDS if decoded else NO_JSON)
@@ -1,12 +1,32 @@
 import pandas as pd
 import re
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from src.db.mongodb_client import load_collection, insert_to_collection
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Without pyarrow, clean_series falls back to clean_text per row
+    pa = None
+    pc = None
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Patterns used by clean_text, compiled once
+URL_PATTERN = re.compile(r"http\S+|www\S+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+SPECIAL_CHARS_PATTERN = re.compile(r"[^a-zA-Z0-9\s]")
+
+# The same patterns for Arrow's RE2 engine, valid for ASCII text only. RE2's \s lacks
+# some characters Python treats as whitespace, so the class is spelled out.
+ASCII_WHITESPACE = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f "
+ARROW_URL_PATTERN = f"http[^{ASCII_WHITESPACE}]+|www[^{ASCII_WHITESPACE}]+"
+ARROW_WHITESPACE_PATTERN = f"[{ASCII_WHITESPACE}]+"
+ARROW_SPECIAL_CHARS_PATTERN = "[^a-zA-Z0-9 ]"  # Whitespace is already collapsed to spaces
+
 def load_data_from_mongo(db, collection_name: str) -> pd.DataFrame:
     """
     Fetches raw customer communication data from MongoDB.
@@ -36,9 +56,9 @@ def clean_text(text: str) -> str:
         return None
     
     text = text.lower()  # Convert to lowercase
-    text = re.sub(r"http\S+|www\S+", "", text)  # Remove URLs
-    text = re.sub(r"\s+", " ", text)  # Replace multiple whitespaces with a single space
-    text = re.sub(r"[^a-zA-Z0-9\s]", "", text)  # Remove special characters
+    text = URL_PATTERN.sub("", text)  # Remove URLs
+    text = WHITESPACE_PATTERN.sub(" ", text)  # Replace multiple whitespaces with a single space
+    text = SPECIAL_CHARS_PATTERN.sub("", text)  # Remove special characters
     
     cleaned_text = text.strip()  # Remove leading/trailing whitespace
     
@@ -46,12 +66,76 @@ def clean_text(text: str) -> str:
     return cleaned_text if cleaned_text else None
 
 
-def clean_data(data: pd.DataFrame) -> pd.DataFrame:
+def _clean_ascii_arrow(texts: pd.Series) -> pd.Series:
+    """Applies the `clean_text` steps to ASCII-only texts with Arrow-backed string operations."""
+    return (
+        texts.astype(pd.ArrowDtype(pa.string())).str
+        .lower()
+        .str.replace(ARROW_URL_PATTERN, "", regex=True)
+        .str.replace(ARROW_WHITESPACE_PATTERN, " ", regex=True)
+        .str.replace(ARROW_SPECIAL_CHARS_PATTERN, "", regex=True)
+        .str.strip(" ")
+        .astype(object)
+    )
+
+
+def clean_series(texts: pd.Series) -> pd.Series:
+    """
+    Vectorized equivalent of applying `clean_text` to every value of a Series.
+    
+    ASCII-only texts are cleaned with vectorized Arrow string operations. Texts with
+    other characters, where Arrow's case mapping and regex classes differ from
+    Python's, go through `clean_text` so the output is always identical.
+    
+    Args:
+        texts (pd.Series): Raw text values; non-string values become None.
+    
+    Returns:
+        pd.Series: Cleaned texts (object dtype), None where `clean_text` returns None.
+    """
+    is_text = texts.map(lambda value: isinstance(value, str)).astype(bool)
+    values = texts[is_text].astype(object)
+    cleaned = pd.Series([None] * len(texts), index=texts.index, dtype=object)
+    if values.empty:
+        return cleaned
+
+    if pa is None:
+        cleaned[is_text] = [clean_text(value) for value in values]
+        return cleaned
+
+    is_ascii = pc.string_is_ascii(pa.array(values.tolist(), type=pa.large_string())).to_numpy(zero_copy_only=False)
+    if is_ascii.any():
+        cleaned[values.index[is_ascii]] = _clean_ascii_arrow(values[is_ascii]).to_numpy()
+    if not is_ascii.all():
+        cleaned[values.index[~is_ascii]] = [clean_text(value) for value in values[~is_ascii]]
+    return cleaned.where(cleaned.notna() & (cleaned != ""), None)
+
+
+def clean_series_parallel(texts: pd.Series, workers: int, chunk_size: int) -> pd.Series:
+    """
+    Runs `clean_series` over chunks of a large Series in a pool of worker processes.
+    
+    Args:
+        texts (pd.Series): Raw text values.
+        workers (int): Number of worker processes.
+        chunk_size (int): Number of values cleaned per task.
+    
+    Returns:
+        pd.Series: Cleaned texts, in the original order and index.
+    """
+    chunks = [texts.iloc[start:start + chunk_size] for start in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return pd.concat(list(pool.map(clean_series, chunks)))
+
+
+def clean_data(data: pd.DataFrame, workers: int = 1, chunk_size: int = 20000) -> pd.DataFrame:
     """
     Cleans raw customer communication data.
     
     Args:
         data (pd.DataFrame): Raw data with at least 'description' column.
+        workers (int): Worker processes used when the frame has more than `chunk_size` rows.
+        chunk_size (int): Rows cleaned per worker task.
     
     Returns:
         pd.DataFrame: Cleaned data.
@@ -60,7 +144,10 @@ def clean_data(data: pd.DataFrame) -> pd.DataFrame:
         raise ValueError("DataFrame must contain a 'description' column", data.columns)
     
     logging.info(f"Starting data cleaning process. {len(data)}")
-    data["description"] = data["description"].apply(clean_text)
+    if workers > 1 and len(data) > chunk_size:
+        data["description"] = clean_series_parallel(data["description"], workers, chunk_size)
+    else:
+        data["description"] = clean_series(data["description"])
     data.dropna(subset=["description"], inplace=True)  # Remove rows with empty communication
     data.reset_index(drop=True, inplace=True)
     logging.info("Data cleaning process completed.")
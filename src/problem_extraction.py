@@ -2,6 +2,8 @@
 import logging
 from typing import Dict, List
 
+import pandas as pd
+
 def standardize_problems(problem: Dict, taxonomy: Dict) -> Dict:
     """Standardize problems based on taxonomy."""
     try:
@@ -29,3 +31,39 @@ def standardize_problems(problem: Dict, taxonomy: Dict) -> Dict:
     except Exception as e:
         logging.error(f"Error in standardizing problem: {str(e)}", exc_info=True)
         return None
+
+
+def load_processed_keys(db, config) -> set:
+    """
+    Fetches, in one query, the keys already extracted with the current prompt version.
+
+    Args:
+        db: MongoDB database connection.
+        config (Dict): Pipeline configuration.
+
+    Returns:
+        set: Keys of the current Jira source with a known problem type for `prompts.version`.
+    """
+    cursor = db[config["mongodb"]["processed_collection"]].find(
+        {
+            "jira_source": config["issue-extractor"]["jira_source"],
+            "version": config["prompts"]["version"],
+            "problem_type": {"$ne": "unknown"}
+        },
+        {"key": 1, "_id": 0}
+    ).batch_size(10000)
+    return {doc["key"] for doc in cursor}
+
+
+def pending_issues(cleaned_data: pd.DataFrame, processed_keys: set) -> pd.DataFrame:
+    """
+    Drops the issues whose keys were already processed.
+
+    A collapsed duplicate group (see `collapse_duplicates`) stays pending while
+    any key in its `duplicate_keys` is unprocessed.
+    """
+    if "duplicate_keys" in cleaned_data.columns:
+        is_pending = cleaned_data["duplicate_keys"].map(lambda keys: not processed_keys.issuperset(keys))
+    else:
+        is_pending = ~cleaned_data["key"].isin(processed_keys)
+    return cleaned_data[is_pending]
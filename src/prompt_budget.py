@@ -0,0 +1,211 @@
+import logging
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a character estimate
+    tiktoken = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+CHARS_PER_TOKEN = 4  # Estimate used when no tokenizer can be loaded
+# Share of the budget held back when tokens are not counted with the model's own tokenizer;
+# tiktoken and the character estimate are 10-30% off Llama-style tokenizers
+DEFAULT_SAFETY_MARGIN = 0.2
+INFORMATIVE_WORD = re.compile(r"[a-z0-9]{4,}")
+COMMENT_PREFIX = re.compile(r"\bcomment (\d+):?\s", re.IGNORECASE)
+
+
+class TokenCounter:
+    """
+    Counts and truncates text in tokens of the prompted model.
+
+    Uses a Hugging Face tokenizer when `tokenizer` names one (e.g. the tokenizer of
+    the Ollama model), else the tiktoken `encoding`. When neither can be loaded
+    (missing package or no network to fetch the vocabulary) tokens are estimated as
+    `CHARS_PER_TOKEN` characters. `exact` tells whether the Hugging Face tokenizer
+    is in use; other counts only approximate the model's.
+
+    Args:
+        encoding (str): tiktoken encoding name.
+        tokenizer (str): Hugging Face Hub tokenizer name; takes precedence over `encoding`.
+    """
+
+    def __init__(self, encoding: Optional[str] = None, tokenizer: Optional[str] = None):
+        self._encode = None
+        self._decode = None
+        self.exact = False
+        try:
+            if tokenizer and Tokenizer is not None:
+                hf_tokenizer = Tokenizer.from_pretrained(tokenizer)
+                self._encode = lambda text: hf_tokenizer.encode(text, add_special_tokens=False).ids
+                self._decode = hf_tokenizer.decode
+                self.exact = True
+            elif encoding and tiktoken is not None:
+                tiktoken_encoding = tiktoken.get_encoding(encoding)
+                self._encode = lambda text: tiktoken_encoding.encode(text, disallowed_special=())
+                self._decode = tiktoken_encoding.decode
+        except Exception as e:
+            logging.warning(f"Could not load tokenizer {tokenizer or encoding}; estimating token counts: {e}")
+        if (tokenizer or encoding) and self._encode is None:
+            logging.warning(f"Estimating token counts as {CHARS_PER_TOKEN} characters per token.")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encode is None:
+            return math.ceil(len(text) / CHARS_PER_TOKEN)
+        return len(self._encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Returns the longest prefix of `text` within `max_tokens`."""
+        if max_tokens <= 0:
+            return ""
+        if self._encode is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        tokens = self._encode(text)
+        return text if len(tokens) <= max_tokens else self._decode(tokens[:max_tokens])
+
+
+def prompt_token_limit(counter: TokenCounter, options: Dict) -> int:
+    """
+    Prompt budget from the `prompt_budget` options, as counted by `counter`.
+
+    Unless the counter uses the model's own tokenizer, `safety_margin` of
+    `max_prompt_tokens` is held back so approximate counts do not overflow the
+    model's context.
+    """
+    max_prompt_tokens = options.get("max_prompt_tokens", 1800)
+    if counter.exact:
+        return max_prompt_tokens
+    return int(max_prompt_tokens * (1 - options.get("safety_margin", DEFAULT_SAFETY_MARGIN)))
+
+
+def split_issue_text(text: str) -> Tuple[str, List[str]]:
+    """
+    Splits an issue text built by `extract_issue_data` into its description and comments.
+
+    Comments are found by their sequential "Comment N" prefixes, which survive
+    cleaning as "comment N", so the numbering also skips mentions inside comment bodies.
+
+    Returns:
+        Tuple[str, List[str]]: The description head and the comments, oldest first, each with its prefix.
+    """
+    starts, number = [], 1
+    for match in COMMENT_PREFIX.finditer(text):
+        if int(match.group(1)) == number:
+            starts.append(match.start())
+            number += 1
+    if not starts:
+        return text, []
+    ends = starts[1:] + [len(text)]
+    return text[:starts[0]], [text[start:end].strip() for start, end in zip(starts, ends)]
+
+
+def informativeness(comment: str) -> int:
+    """Number of distinct words of four or more characters; short acknowledgements score low."""
+    return len(set(INFORMATIVE_WORD.findall(comment.lower())))
+
+
+class PromptBudget:
+    """
+    Fits the issue text and similar cases of an extraction prompt into a token budget.
+
+    The issue text keeps the first `head_tokens` of the description, then the
+    `recent_comments` latest comments, then the most informative older comments,
+    in their original order. Similar cases are kept most similar first and get at
+    most `similar_cases_share` of the budget, plus whatever the issue text leaves.
+
+    Args:
+        counter (TokenCounter): Token counter of the prompted model.
+        max_prompt_tokens (int): Budget for the filled prompt.
+        head_tokens (int): Description tokens always kept.
+        recent_comments (int): Latest comments kept before older ones.
+        similar_cases_share (float): Share of the budget reserved for similar cases.
+    """
+
+    def __init__(self, counter: TokenCounter, max_prompt_tokens: int = 1800, head_tokens: int = 600,
+                 recent_comments: int = 2, similar_cases_share: float = 0.3):
+        self.counter = counter
+        self.max_prompt_tokens = max_prompt_tokens
+        self.head_tokens = head_tokens
+        self.recent_comments = recent_comments
+        self.similar_cases_share = similar_cases_share
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["PromptBudget"]:
+        """Creates the budget from `prompt_budget`, or returns None when it is disabled."""
+        options = config.get("prompt_budget", {})
+        if not options.get("enabled", False):
+            return None
+        counter = TokenCounter(options.get("encoding", "cl100k_base"), options.get("tokenizer"))
+        return cls(
+            counter,
+            max_prompt_tokens=prompt_token_limit(counter, options),
+            head_tokens=options.get("head_tokens", 600),
+            recent_comments=options.get("recent_comments", 2),
+            similar_cases_share=options.get("similar_cases_share", 0.3)
+        )
+
+    def fit_issue_text(self, text: str, budget: int) -> str:
+        """Keeps the description head and the most useful comments of `text` within `budget` tokens."""
+        if self.counter.count(text) <= budget:
+            return text
+        head, comments = split_issue_text(text)
+        head = self.counter.truncate(head, min(self.head_tokens, budget)).strip()
+        remaining = budget - self.counter.count(head)
+
+        recent = list(range(len(comments)))[::-1][:self.recent_comments]
+        older = sorted(set(range(len(comments))) - set(recent), key=lambda i: (-informativeness(comments[i]), -i))
+        kept = set()
+        for i in recent + older:
+            tokens = self.counter.count(comments[i]) + 1
+            if tokens <= remaining:
+                kept.add(i)
+                remaining -= tokens
+        if not kept and comments and remaining > 0:
+            # Not even one full comment fits; keep the start of the latest one
+            return f"{head} {self.counter.truncate(comments[-1], remaining - 1)}".strip()
+        return " ".join([head] + [comments[i] for i in sorted(kept)]).strip()
+
+    def fit_similar_cases(self, cases: List[str], budget: int) -> str:
+        """Keeps whole similar cases, most similar first, within `budget` tokens."""
+        kept, remaining = [], budget
+        for case in cases:
+            tokens = self.counter.count(case) + 1
+            if tokens > remaining:
+                if not kept and remaining > 0:
+                    kept.append(self.counter.truncate(case, remaining - 1))
+                break
+            kept.append(case)
+            remaining -= tokens
+        return "\n".join(kept)
+
+    def fit(self, template: str, text: str, similar_cases: List[str]) -> Tuple[str, str, int]:
+        """
+        Fits the issue text and similar cases into the prompt budget.
+
+        Args:
+            template (str): Prompt template; its fixed text counts against the budget.
+            text (str): Issue text.
+            similar_cases (List[str]): Similar cases, most similar first.
+
+        Returns:
+            Tuple[str, str, int]: The issue text, the joined similar cases and the number of dropped tokens.
+        """
+        available = max(self.max_prompt_tokens - self.counter.count(template), 0)
+        similar_tokens = sum(self.counter.count(case) + 1 for case in similar_cases)
+        text_budget = available - min(similar_tokens, int(available * self.similar_cases_share))
+
+        fitted_text = self.fit_issue_text(text, text_budget)
+        text_tokens = self.counter.count(fitted_text)
+        fitted_cases = self.fit_similar_cases(similar_cases, available - text_tokens)
+
+        dropped = (self.counter.count(text) + self.counter.count("\n".join(similar_cases))
+                   - text_tokens - self.counter.count(fitted_cases))
+        return fitted_text, fitted_cases, max(dropped, 0)
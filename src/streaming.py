@@ -0,0 +1,195 @@
+import json
+import logging
+import re
+import threading
+import time
+from typing import List, Optional
+
+from langchain_core.caches import BaseCache
+from langchain_core.outputs import Generation
+
+# Early-stopped outputs are cached apart from full generations; bumped when the stop rule changes
+STREAM_CACHE_NAMESPACE = "stream-json-objects"
+# Characters that may sit between the JSON values of one answer without ending it
+VALUE_SEPARATORS = " \t\r\n,`"
+# The language tag of a code fence opening the next value, possibly still being streamed
+FENCE_TAG = re.compile(r"```j?s?o?n?$", re.IGNORECASE)
+
+
+class JsonValueScanner:
+    """
+    Incremental scanner finding complete top-level JSON objects and arrays in streamed text.
+
+    Tracks bracket depth outside strings as chunks arrive, so each character is
+    looked at once. A closed top-level value only counts when it decodes as JSON,
+    which skips prose such as "[email]". Once other text than whitespace, commas
+    or ```json fences follows the last value, `run_ended` tells the model has
+    moved on from its JSON.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.values: List = []
+        self.end = 0  # End of the last complete value
+        self.objects = 0  # Complete objects, counting every item of an array
+        self.run_ended = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = None
+
+    def feed(self, chunk: str) -> int:
+        """Adds a chunk and returns the number of complete values so far."""
+        offset = len(self.text)
+        self.text += chunk
+        for i, char in enumerate(chunk, start=offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif self._depth == 0 and char not in "{[":
+                if self.values and char not in VALUE_SEPARATORS and not FENCE_TAG.search(self.text[self.end:i + 1]):
+                    self.run_ended = True
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._close(i + 1)
+        return len(self.values)
+
+    def _close(self, end: int):
+        try:
+            value = json.loads(self.text[self._start:end])
+            self.values.append(value)
+            self.objects += len(value) if isinstance(value, list) else 1
+            self.end = end
+            self.run_ended = False
+        except json.JSONDecodeError:
+            pass
+        self._start = None
+
+
+class StreamStats:
+    """
+    Thread-safe counters of streamed extraction calls and the generation they cut off.
+
+    What an early stop saves cannot be observed on the call itself, so one call in
+    `sample_every` is streamed to the end and its tokens and seconds after the
+    JSON run are measured; their averages estimate the saving per stop.
+
+    Args:
+        sample_every (int): Every n-th call is generated in full to measure the tail; 0 never samples.
+    """
+
+    def __init__(self, sample_every: int = 20):
+        self.sample_every = sample_every
+        self.calls = 0
+        self.stopped = 0
+        self.tokens = 0
+        self.sampled = 0
+        self.tail_tokens = 0
+        self.tail_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def next_call_is_sample(self) -> bool:
+        with self._lock:
+            self.calls += 1
+            return self.sample_every > 0 and self.calls % self.sample_every == 1 % self.sample_every
+
+    def record(self, tokens: int, stopped: bool, tail_tokens: Optional[int] = None, tail_seconds: float = 0.0):
+        with self._lock:
+            self.tokens += tokens
+            self.stopped += stopped
+            if tail_tokens is not None:
+                self.sampled += 1
+                self.tail_tokens += tail_tokens
+                self.tail_seconds += tail_seconds
+
+    def estimated_saving(self):
+        """Average tokens and seconds generated after the needed values, from the sampled calls."""
+        with self._lock:
+            if not self.sampled:
+                return None, None
+            return self.tail_tokens / self.sampled, self.tail_seconds / self.sampled
+
+    def log_summary(self):
+        tokens, seconds = self.estimated_saving()
+        saving = (f"~{tokens * self.stopped:.0f} tokens and ~{seconds * self.stopped:.0f}s saved "
+                  f"(from {self.sampled} sampled full generations)" if tokens is not None else "saving not sampled")
+        logging.info(f"Streamed extraction: {self.calls} calls, {self.tokens} tokens received, "
+                     f"{self.stopped} stopped early, {saving}.")
+
+
+def stream_until_complete(llm, prompt: str, stats: StreamStats, max_values: int = 1, label: str = "") -> str:
+    """
+    Streams a completion and stops the generation once the model's JSON run has ended.
+
+    The run ends when at least `max_values` JSON objects are complete (each item of
+    an array counts) and prose follows the last value, so answers with several
+    problem objects keep all of them. This waits for one token past the JSON and
+    saves nothing when the model ends its answer with the JSON; an answer that puts
+    prose between its first `max_values` objects runs to the end, one that puts
+    prose after them loses the later ones. Closing the stream closes the connection, which makes Ollama
+    stop generating. Results are kept in the LLM's cache, in a namespace of their own.
+
+    Args:
+        llm: LangChain LLM supporting `stream`.
+        prompt (str): Rendered prompt.
+        stats (StreamStats): Shared counters; also decides which calls are sampled in full.
+        max_values (int): Complete JSON objects to wait for at least, e.g. the items of a batch.
+        label (str): Name of the call for the log, e.g. the issue key.
+
+    Returns:
+        str: Generated text up to the end of the JSON run (the full text for sampled calls).
+    """
+    cache = llm.cache if isinstance(llm.cache, BaseCache) else None
+    if cache is not None:
+        cached = cache.lookup(prompt, STREAM_CACHE_NAMESPACE)
+        if cached:
+            return cached[0].text
+
+    scanner = JsonValueScanner()
+    sample = stats.next_call_is_sample()
+    tokens, complete_tokens, complete_at = 0, None, None
+    stream = llm.stream(prompt)
+    try:
+        for chunk in stream:
+            tokens += 1
+            if complete_at is None:
+                scanner.feed(chunk)
+                if scanner.objects >= max_values and scanner.run_ended:
+                    complete_tokens, complete_at = tokens, time.perf_counter()
+                    if not sample:
+                        break
+            else:
+                scanner.text += chunk
+    finally:
+        stream.close()
+
+    stopped = complete_at is not None and not sample
+    if sample and complete_at is not None:
+        tail_tokens, tail_seconds = tokens - complete_tokens, time.perf_counter() - complete_at
+        stats.record(tokens, stopped, tail_tokens, tail_seconds)
+        logging.info(f"Streamed {label} in full: {tail_tokens} tokens and {tail_seconds:.1f}s "
+                     f"came after the JSON.")
+        text = scanner.text
+    else:
+        stats.record(tokens, stopped)
+        text = scanner.text[:scanner.end] if stopped else scanner.text
+        if stopped:
+            saved_tokens, saved_seconds = stats.estimated_saving()
+            saving = (f"~{saved_tokens:.0f} tokens and ~{saved_seconds:.1f}s saved"
+                      if saved_tokens is not None else "saving not sampled yet")
+            logging.info(f"Stopped {label} after {tokens} tokens; {saving}.")
+
+    if cache is not None:
+        cache.update(prompt, STREAM_CACHE_NAMESPACE, [Generation(text=text)])
+    return text
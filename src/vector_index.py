@@ -0,0 +1,219 @@
+import json
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from src.embedding_engine import embed_matrix
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.json"
+CENTROIDS_FILE = "centroids.npy"
+ASSIGNMENTS_FILE = "assignments.npy"
+IVF_SAMPLE_SIZE = 100000  # Vectors used to train the IVF centroids
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.ascontiguousarray(matrix / np.clip(norms, 1e-12, None), dtype=np.float32)
+
+
+def _save_npy(path: Path, array: np.ndarray):
+    tmp_path = path.with_suffix(".tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process vector store over a memory-mapped float32 matrix.
+
+    Vectors are stored unit-length in `vectors.npy`, with the chunk ids, texts and
+    metadata in `chunks.json`, and searched by cosine similarity. Small collections
+    are searched exhaustively; from `ivf_threshold` vectors on an inverted-file
+    index (k-means centroids plus each vector's list) limits every search to the
+    `nprobe` lists nearest to the query. With IVF the rows are stored grouped by
+    list, so each probed list is a contiguous slice of the memory map. The centroids
+    are retrained when the collection has doubled since they were trained.
+
+    Args:
+        embedding (Embeddings): Embedding function for added texts and queries.
+        persist_directory (str): Directory holding the index files.
+        ivf_threshold (int): Number of vectors from which the IVF index is used.
+        nprobe (int): Inverted lists searched per query.
+    """
+
+    def __init__(self, embedding: Embeddings, persist_directory: str, ivf_threshold: int = 50000, nprobe: int = 8):
+        self._embedding = embedding
+        self.directory = Path(persist_directory)
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+        self._lists = None
+        self._trained_size = 0
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _load(self):
+        chunks_path = self.directory / CHUNKS_FILE
+        if not chunks_path.exists():
+            return
+        with open(chunks_path) as f:
+            chunks = json.load(f)
+        self._ids, self._texts, self._metadatas = chunks["ids"], chunks["texts"], chunks["metadatas"]
+        self._trained_size = chunks.get("trained_size", 0)
+        self._vectors = np.load(self.directory / VECTORS_FILE, mmap_mode="r")
+        if (self.directory / CENTROIDS_FILE).exists():
+            self._centroids = np.load(self.directory / CENTROIDS_FILE)
+            self._assignments = np.load(self.directory / ASSIGNMENTS_FILE, mmap_mode="r")
+
+    def _train_ivf(self):
+        from sklearn.cluster import MiniBatchKMeans
+
+        n_lists = int(math.sqrt(len(self._vectors)))
+        rng = np.random.default_rng(0)
+        sample = self._vectors[np.sort(rng.choice(len(self._vectors), min(len(self._vectors), IVF_SAMPLE_SIZE),
+                                                  replace=False))]
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, n_init=1, batch_size=4096, random_state=0).fit(sample)
+        self._centroids = _normalize(kmeans.cluster_centers_)
+        self._trained_size = len(self._vectors)
+        logging.info(f"Trained IVF index with {n_lists} lists on {len(sample)} vectors.")
+
+    def _assign(self) -> np.ndarray:
+        block = max(1, 2 ** 24 // len(self._centroids))
+        return np.concatenate([np.argmax(self._vectors[start:start + block] @ self._centroids.T, axis=1)
+                               for start in range(0, len(self._vectors), block)]).astype(np.int32)
+
+    def _save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lists = None
+        size = len(self._vectors)
+        if size < self.ivf_threshold:
+            self._centroids, self._assignments, self._trained_size = None, None, 0
+            for name in (CENTROIDS_FILE, ASSIGNMENTS_FILE):
+                (self.directory / name).unlink(missing_ok=True)
+        else:
+            if self._centroids is None or size > 2 * self._trained_size:
+                self._train_ivf()
+            assignments = self._assign()
+            order = np.argsort(assignments, kind="stable")
+            self._keep(order)
+            self._assignments = assignments[order]
+            _save_npy(self.directory / CENTROIDS_FILE, self._centroids)
+            _save_npy(self.directory / ASSIGNMENTS_FILE, self._assignments)
+
+        _save_npy(self.directory / VECTORS_FILE, np.ascontiguousarray(self._vectors, dtype=np.float32))
+        tmp_path = self.directory / f"{CHUNKS_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas,
+                       "trained_size": self._trained_size}, f)
+        os.replace(tmp_path, self.directory / CHUNKS_FILE)
+        self._vectors = np.load(self.directory / VECTORS_FILE, mmap_mode="r")
+
+    def _keep(self, rows: np.ndarray):
+        """Keeps the rows selected by a boolean mask or an index array, in that order."""
+        positions = np.flatnonzero(rows) if rows.dtype == bool else rows
+        self._ids = [self._ids[i] for i in positions]
+        self._texts = [self._texts[i] for i in positions]
+        self._metadatas = [self._metadatas[i] for i in positions]
+        self._vectors = np.asarray(self._vectors)[positions]
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[Dict]] = None, *,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        ids = list(ids) if ids is not None else [str(len(self._ids) + i) for i in range(len(texts))]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        if not texts:
+            return []
+        vectors = _normalize(embed_matrix(self._embedding, texts))
+        replaced = set(ids)
+        if replaced & set(self._ids):
+            self._keep(np.array([i not in replaced for i in self._ids], dtype=bool))
+
+        self._ids += ids
+        self._texts += texts
+        self._metadatas += metadatas
+        self._vectors = vectors if len(self._vectors) == 0 else np.concatenate([self._vectors, vectors])
+        self._save()
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        removed = set(ids)
+        self._keep(np.array([i not in removed for i in self._ids], dtype=bool))
+        self._save()
+        return True
+
+    def reset_collection(self):
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._save()
+
+    def get(self, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Returns all stored chunks in the shape of `Chroma.get`; embeddings come back as one matrix."""
+        include = ["documents", "metadatas"] if include is None else include
+        result = {"ids": list(self._ids)}
+        if "documents" in include:
+            result["documents"] = list(self._texts)
+        if "metadatas" in include:
+            result["metadatas"] = list(self._metadatas)
+        if "embeddings" in include:
+            result["embeddings"] = self._vectors
+        return result
+
+    def _probe_ranges(self, query: np.ndarray) -> Optional[List[tuple]]:
+        """Row ranges of the `nprobe` lists nearest to the query, or None without IVF."""
+        if self._centroids is None:
+            return None
+        if self._lists is None:
+            # Vectors are stored grouped by list, so every list is one contiguous range
+            self._lists = np.searchsorted(self._assignments, np.arange(len(self._centroids) + 1))
+        probe = np.argsort(-(self._centroids @ query))[:self.nprobe]
+        return [(self._lists[c], self._lists[c + 1]) for c in probe]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        if not self._ids:
+            return []
+        query = _normalize(np.asarray([embedding], dtype=np.float32))[0]
+        ranges = self._probe_ranges(query)
+        candidates = None
+        if ranges is None:
+            scores = self._vectors @ query
+        else:
+            # Each probed list is scored as a slice of the memory map, without gathering rows
+            scores = np.concatenate([self._vectors[start:end] @ query for start, end in ranges])
+            candidates = np.concatenate([np.arange(start, end) for start, end in ranges])
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        positions = top if candidates is None else candidates[top]
+        return [Document(page_content=self._texts[i], metadata=self._metadatas[i], id=self._ids[i])
+                for i in positions]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[Dict]] = None, *,
+                   ids: Optional[List[str]] = None, persist_directory: str = "./data/vectorindex",
+                   **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding, persist_directory, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
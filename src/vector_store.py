@@ -0,0 +1,182 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from langchain_chroma import Chroma
+from langchain_core.vectorstores import VectorStore
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.vector_index import NumpyVectorStore
+
+ADD_BATCH_SIZE = 1000  # Stays below Chroma's maximum batch size
+SCORE_BLOCK_ELEMENTS = 2 ** 25  # Query-by-chunk scores computed at once (128 MB of float32)
+
+
+def chunk_id(key: str, chunk: str) -> str:
+    """Stable id of a chunk: the issue key plus a hash of the chunk content."""
+    return f"{key}:{hashlib.sha1(chunk.encode('utf-8')).hexdigest()}"
+
+
+def split_documents(documents: pd.DataFrame, chunk_size: int = 1000, chunk_overlap: int = 200) -> Dict[str, Dict]:
+    """
+    Splits every issue description into chunks keyed by their stable ids.
+
+    Args:
+        documents (pd.DataFrame): Cleaned data with 'key' and 'description' columns.
+        chunk_size (int): Maximum characters per chunk.
+        chunk_overlap (int): Characters shared by consecutive chunks.
+
+    Returns:
+        Dict[str, Dict]: Chunk text and metadata by chunk id.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = {}
+    for key, description in zip(documents["key"], documents["description"]):
+        for chunk in text_splitter.split_text(description):
+            chunks[chunk_id(key, chunk)] = {"text": chunk, "metadata": {"key": key}}
+    return chunks
+
+
+def open_vector_store(embeddings, persist_directory: str = "./data/vectorstore", collection_name: str = "issues",
+                      backend: str = "chroma", index_options: Optional[Dict] = None) -> VectorStore:
+    """
+    Opens the persisted vector store of the configured backend.
+
+    Args:
+        embeddings: Embedding function used by the store.
+        persist_directory (str): Directory of the persisted store.
+        collection_name (str): Collection holding the chunks.
+        backend (str): "chroma" or "numpy" (the in-process `NumpyVectorStore`).
+        index_options (Dict): Keyword arguments of `NumpyVectorStore`, e.g. `ivf_threshold` and `nprobe`.
+
+    Returns:
+        VectorStore: The opened store.
+    """
+    if backend == "chroma":
+        return Chroma(collection_name=collection_name, embedding_function=embeddings,
+                      persist_directory=str(Path(persist_directory)))
+    if backend == "numpy":
+        return NumpyVectorStore(embeddings, str(Path(persist_directory) / collection_name), **(index_options or {}))
+    raise ValueError(f"Unknown vector store backend: {backend}")
+
+
+def create_vector_store(documents: pd.DataFrame, embeddings, persist_directory: str = "./data/vectorstore",
+                        collection_name: str = "issues", incremental: bool = True, backend: str = "chroma",
+                        index_options: Optional[Dict] = None) -> VectorStore:
+    """
+    Creates or updates the persisted vector store of issue chunks.
+
+    In incremental mode only chunks whose id is not stored yet are embedded and
+    added, and stored chunks of changed or removed issues are deleted; everything
+    else in the persisted collection is left untouched. Otherwise the store is
+    emptied and rebuilt from all chunks.
+
+    Args:
+        documents (pd.DataFrame): Cleaned data with 'key' and 'description' columns.
+        embeddings: Embedding function used by the store.
+        persist_directory (str): Directory of the persisted store.
+        collection_name (str): Chroma collection holding the chunks.
+        incremental (bool): Update the existing store instead of rebuilding it.
+        backend (str): Vector store backend, see `open_vector_store`.
+        index_options (Dict): Options of the numpy backend.
+
+    Returns:
+        VectorStore: The vector store.
+    """
+    chunks = split_documents(documents)
+    vector_store = open_vector_store(embeddings, persist_directory, collection_name, backend, index_options)
+    # Chroma limits the batch size; the numpy store rewrites its files on every call
+    batch_size = ADD_BATCH_SIZE if isinstance(vector_store, Chroma) else max(len(chunks), 1)
+    if not incremental:
+        logging.info("Removing existing vector store contents.")
+        vector_store.reset_collection()
+    stored_ids = set(vector_store.get(include=[])["ids"])
+
+    stale_ids = list(stored_ids - chunks.keys())
+    for start in range(0, len(stale_ids), batch_size):
+        vector_store.delete(ids=stale_ids[start:start + batch_size])
+
+    new_ids: List[str] = [i for i in chunks if i not in stored_ids]
+    for start in range(0, len(new_ids), batch_size):
+        batch = new_ids[start:start + batch_size]
+        vector_store.add_texts(
+            texts=[chunks[i]["text"] for i in batch],
+            metadatas=[chunks[i]["metadata"] for i in batch],
+            ids=batch
+        )
+    logging.info(f"Vector store {collection_name}: {len(new_ids)} chunks embedded, {len(stale_ids)} removed, "
+                 f"{len(chunks) - len(new_ids)} unchanged.")
+    return vector_store
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scales rows to unit length so dot products are cosine similarities."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.clip(norms, 1e-12, None)).astype(np.float32, copy=False)
+
+
+def top_k_excluding(queries: np.ndarray, matrix: np.ndarray, exclude: List[np.ndarray], k: int) -> List[np.ndarray]:
+    """
+    Finds the `k` rows of `matrix` most similar to each query, skipping excluded rows.
+
+    Queries are scored in blocks against the whole matrix with one matrix product
+    each, and only the top `k` of every row is sorted.
+
+    Args:
+        queries (np.ndarray): Unit-length query vectors.
+        matrix (np.ndarray): Unit-length candidate vectors.
+        exclude (List[np.ndarray]): Candidate row indices to skip, per query.
+        k (int): Number of neighbours per query.
+
+    Returns:
+        List[np.ndarray]: Candidate row indices per query, most similar first.
+    """
+    k = min(k, len(matrix))
+    block = max(1, SCORE_BLOCK_ELEMENTS // max(len(matrix), 1))
+    results = []
+    for start in range(0, len(queries), block):
+        scores = queries[start:start + block] @ matrix.T
+        for row, excluded in enumerate(exclude[start:start + block]):
+            scores[row, excluded] = -np.inf
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k else np.empty((len(scores), 0), dtype=int)
+        for row, candidates in enumerate(top):
+            candidates = candidates[np.argsort(-scores[row, candidates])]
+            results.append(candidates[np.isfinite(scores[row, candidates])])
+    return results
+
+
+def similar_cases_for_keys(vector_store: VectorStore, keys: List[str], k: int = 3) -> Dict[str, List[str]]:
+    """
+    Retrieves the `k` most similar chunks of other issues for many issues in one pass.
+
+    Works on the chunk vectors already stored by `create_vector_store`, so nothing is
+    embedded again: an issue is represented by the centroid of its own chunks, and
+    its own chunks are excluded from the results.
+
+    Args:
+        vector_store (VectorStore): Store created by `create_vector_store`.
+        keys (List[str]): Issue keys to retrieve similar cases for.
+        k (int): Similar cases per issue.
+
+    Returns:
+        Dict[str, List[str]]: Similar chunk texts by key, most similar first. Keys without stored chunks are missing.
+    """
+    stored = vector_store.get(include=["embeddings", "documents", "metadatas"])
+    if not stored["ids"]:
+        return {}
+    matrix = normalize_rows(np.asarray(stored["embeddings"], dtype=np.float32))
+    chunks_by_key: Dict[str, List[int]] = {}
+    for position, metadata in enumerate(stored["metadatas"]):
+        chunks_by_key.setdefault((metadata or {}).get("key"), []).append(position)
+
+    found = [key for key in dict.fromkeys(keys) if key in chunks_by_key]
+    if not found:
+        return {}
+    own_chunks = [np.array(chunks_by_key[key]) for key in found]
+    queries = normalize_rows(np.stack([matrix[rows].mean(axis=0) for rows in own_chunks]))
+    neighbours = top_k_excluding(queries, matrix, own_chunks, k)
+    logging.info(f"Retrieved similar cases for {len(found)} issues against {len(matrix)} chunks in one pass.")
+    return {key: [stored["documents"][i] for i in rows] for key, rows in zip(found, neighbours)}
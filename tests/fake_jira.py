@@ -0,0 +1,36 @@
+def make_issue(idx: int, comments: int = 0, inline_comments: int = None) -> dict:
+    """Builds a minimal Jira issue payload with `comments` comments, `inline_comments` of them inlined."""
+    thread = [
+        {"id": str(idx * 1000 + c), "author": {"displayName": "Support Engineer"},
+         "body": f"Comment {c} on issue {idx}", "created": "2024-01-01T12:00:00.000+0000"}
+        for c in range(comments)
+    ]
+    inline = thread if inline_comments is None else thread[:inline_comments]
+    return {
+        "id": str(10000 + idx),
+        "key": f"SUPPORT-{idx}",
+        "self": f"http://localhost/rest/api/2/issue/{10000 + idx}",
+        "fields": {
+            "summary": f"Issue {idx}",
+            "description": f"Description of issue {idx}",
+            "status": {"name": "Open"},
+            "created": "2024-01-01T10:00:00.000+0000",
+            "updated": f"2024-01-02T10:{idx % 60:02d}:00.000+0000",
+            "components": [{"name": "C8-SM"}],
+            "issuetype": {"name": "Bug"},
+            "priority": {"name": "High"},
+            "labels": [],
+            "customfield_11212": "cid-1",
+            "customfield_99999": "x" * 100,
+            "comment": {"comments": inline, "total": len(thread), "maxResults": len(inline), "startAt": 0},
+        },
+    }
+
+
+def make_issues(total: int) -> list:
+    return [make_issue(i) for i in range(total)]
+
+
+def make_comment_thread(idx: int, comments: int) -> list:
+    """Full comment thread of `make_issue(idx, comments)`, as served by the comment endpoint."""
+    return make_issue(idx, comments=comments)["fields"]["comment"]["comments"]
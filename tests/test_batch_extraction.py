@@ -0,0 +1,46 @@
+from src.batch_extraction import format_batch_issues, parse_batch_output, plan_batches
+from src.output_parser import to_problem
+from src.prompt_budget import TokenCounter
+
+
+def rows(*lengths):
+    return [{"key": f"A-{i}", "description": "x" * length} for i, length in enumerate(lengths)]
+
+
+def test_plan_batches_packs_short_issues_within_budget():
+    counter = TokenCounter()  # 4 characters per token
+    units = plan_batches(rows(40, 40, 2000, 40, 40, 40), counter, "", max_prompt_tokens=100,
+                         max_items=8, short_issue_tokens=50, similar_case_tokens=10)
+    # Each short item takes 10 + 10 + 12 = 32 tokens, so three fit into 100
+    assert [[r["key"] for r in unit] for unit in units] == [["A-2"], ["A-0", "A-1", "A-3"], ["A-4", "A-5"]]
+
+
+def test_plan_batches_respects_max_items():
+    units = plan_batches(rows(4, 4, 4), TokenCounter(), "", max_prompt_tokens=1000, max_items=2)
+    assert [len(unit) for unit in units] == [2, 1]
+
+
+def test_format_batch_issues_numbers_items():
+    text = format_batch_issues(rows(4, 4), {"A-1": ["similar " * 20]}, TokenCounter(), similar_case_tokens=2)
+    assert text == "Case 1: xxxx\n\nCase 2: xxxx\nSimilar case for 2: similar "
+
+
+def test_parse_batch_output_groups_problems_by_id():
+    output = """Here you go:
+    ```json
+    [
+      {"ID": 1, "Problem": "Broker restarts", "Severity": "High", "Impact": "Outage"},
+      {"ID": "3", "Problem": "Slow importer", "Severity": "Low", "Impact": "Stale dashboards"},
+      {"Problem": "no id"}
+    ]
+    ```
+    Also {"ID": 1, "Problem": "Gateway timeouts", "Severity": "Medium", "Impact": "Retries"} and {broken"""
+    parsed = parse_batch_output(output)
+    assert sorted(parsed) == [1, 3]
+    assert [to_problem(p)["description"] for p in parsed[1]] == ["Broker restarts", "Gateway timeouts"]
+    assert to_problem(parsed[3][0]) == {"description": "Slow importer", "severity": "Low", "impact": "Stale dashboards"}
+
+
+def test_parse_batch_output_drops_items_without_problem_text():
+    output = '[{"ID": 1, "Problem": "Broker restarts"}, {"ID": 2}, {"ID": 3, "Problem": ""}, {"ID": 3, "Problem": "  "}]'
+    assert sorted(parse_batch_output(output)) == [1]
@@ -0,0 +1,40 @@
+import pandas as pd
+from src.dedupe import collapse_duplicates, fan_out_problems, near_duplicate_groups, simhash
+
+TEMPLATE = ("zeebe gateway pods restart after upgrading the helm chart on azure aks cluster "
+            "the brokers lose leadership and the operate importer falls behind for several hours")
+
+
+def test_simhash_is_close_for_near_duplicates():
+    near = simhash(TEMPLATE + " again")
+    other = simhash("login page shows a blank screen when sso is enabled for the web modeler")
+    assert bin(simhash(TEMPLATE) ^ near).count("1") <= 8
+    assert bin(simhash(TEMPLATE) ^ other).count("1") > 8
+
+
+def test_near_duplicate_groups_uses_hamming_distance():
+    assert near_duplicate_groups([0b0, 0b1, 0b111111, 0b0], max_distance=1) == [0, 0, 2, 0]
+
+
+def test_collapse_duplicates_keeps_one_row_per_group():
+    data = pd.DataFrame({
+        "key": ["A-1", "A-2", "A-3", "A-4"],
+        "cid": ["c1", "c2", "c3", "c4"],
+        "description": [TEMPLATE, "a completely different problem with the identity service", TEMPLATE,
+                        TEMPLATE + " again"],
+    })
+    collapsed = collapse_duplicates(data, max_distance=8)
+    assert collapsed["key"].tolist() == ["A-1", "A-2"]
+    assert collapsed["duplicate_keys"].tolist() == [["A-1", "A-3", "A-4"], ["A-2"]]
+    assert collapsed["duplicate_cids"].tolist() == [["c1", "c3", "c4"], ["c2"]]
+
+    exact_only = collapse_duplicates(data, max_distance=0)
+    assert exact_only["duplicate_keys"].tolist() == [["A-1", "A-3"], ["A-2"], ["A-4"]]
+
+
+def test_fan_out_problems_copies_to_every_member():
+    row = pd.Series({"key": "A-1", "duplicate_keys": ["A-1", "A-3"], "duplicate_cids": ["c1", "c3"]})
+    problems = [{"description": "pods restart", "key": "A-1", "customer_id": "c1"}]
+    fanned_out = fan_out_problems(problems, row)
+    assert [(p["key"], p["customer_id"]) for p in fanned_out] == [("A-1", "c1"), ("A-3", "c3")]
+    assert all(p["representative_key"] == "A-1" for p in fanned_out)
@@ -0,0 +1,62 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[len(t), 0.5] for t in texts]
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return [len(text), 1.0]
+
+
+def test_cached_embeddings_only_embed_misses(tmp_path):
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, "mini", str(tmp_path / "cache.sqlite"))
+    assert cache.embed_documents(["a", "bb", "a"]) == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+    assert model.embedded == ["a", "bb"]
+
+    assert cache.embed_documents(["bb", "ccc"]) == [[2.0, 0.5], [3.0, 0.5]]
+    assert model.embedded == ["a", "bb", "ccc"]
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_cache_persists_per_model_and_kind(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    CachedEmbeddings(CountingEmbeddings(), "mini", path).embed_documents(["a"])
+
+    model = CountingEmbeddings()
+    reopened = CachedEmbeddings(model, "mini", path)
+    assert reopened.embed_documents(["a"]) == [[1.0, 0.5]]
+    assert reopened.embed_query("a") == [1.0, 1.0]
+    assert CachedEmbeddings(model, "other", path).embed_documents(["a"]) == [[1.0, 0.5]]
+    assert model.embedded == ["a", "a"]
+    assert reopened.hit_rate == 0.5
+
+
+class MatrixEmbeddings(CountingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        return np.array([[len(t), 0.25] for t in texts], dtype=np.float32)
+
+
+def test_cached_encode_returns_float32_matrix_and_uses_the_model_matrix_path(tmp_path):
+    model = MatrixEmbeddings()
+    cache = CachedEmbeddings(model, "mini", str(tmp_path / "cache.sqlite"))
+    cache.encode(["a", "bb"])
+    matrix = cache.encode(["bb", "ccc", "a"])
+
+    assert isinstance(matrix, np.ndarray) and matrix.dtype == np.float32 and matrix.flags.c_contiguous
+    assert matrix.tolist() == [[2.0, 0.25], [3.0, 0.25], [1.0, 0.25]]
+    assert model.encoded == ["a", "bb", "ccc"]
+    assert model.embedded == []
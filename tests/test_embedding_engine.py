@@ -0,0 +1,35 @@
+import numpy as np
+import src.embedding_engine as embedding_engine
+from src.embedding_engine import EmbeddingEngine, embed_matrix
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size, convert_to_numpy, normalize_embeddings, show_progress_bar):
+        self.calls.append(list(texts))
+        vectors = np.array([[len(t), 1.0] for t in texts])
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+def test_encode_returns_float32_matrix_in_input_order(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(embedding_engine, "load_model", lambda name, device: model)
+    engine = EmbeddingEngine("mini", batch_size=2, normalize=False)
+
+    matrix = engine.encode(["ccc", "a", "bb"])
+    assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+    assert matrix[:, 0].tolist() == [3.0, 1.0, 2.0]
+    assert model.calls == [["a", "bb", "ccc"]]  # Sorted by length before batching
+
+
+def test_encode_normalizes_and_serves_langchain_interface(monkeypatch):
+    monkeypatch.setattr(embedding_engine, "load_model", lambda name, device: FakeModel())
+    engine = EmbeddingEngine("mini")
+    matrix = engine.encode(["abc", "a"])
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
+    assert engine.embed_query("abc") == matrix[0].tolist()
+    assert np.array_equal(embed_matrix(engine, ["abc", "a"]), matrix)
@@ -0,0 +1,65 @@
+import pytest
+from jira import JIRA
+from src.jira_pagination import AdaptiveRateLimiter, iter_issue_pages, iter_updated_pages
+from src.jira_replay import ReplayJiraServer
+from tests.fake_jira import make_issues
+
+
+def connect(server):
+    return JIRA(server=server.url, max_retries=0)
+
+
+def test_iter_issue_pages_concurrent_returns_pages_in_order():
+    with ReplayJiraServer(make_issues(250)) as server:
+        limiter = AdaptiveRateLimiter(initial_delay=0)
+        pages = list(iter_issue_pages(connect(server), "project = SUPPORT", max_results=50,
+                                      concurrency=4, limiter=limiter))
+
+    assert [start for start, _ in pages] == [0, 50, 100, 150, 200]
+    keys = [issue.key for _, issues in pages for issue in issues]
+    assert keys == [f"SUPPORT-{i}" for i in range(250)]
+    assert sorted(server.search_requests) == [0, 50, 100, 150, 200]
+
+
+def test_iter_issue_pages_sequential():
+    with ReplayJiraServer(make_issues(120)) as server:
+        pages = list(iter_issue_pages(connect(server), "project = SUPPORT", max_results=50,
+                                      concurrency=1, limiter=AdaptiveRateLimiter(initial_delay=0)))
+
+    assert [len(issues) for _, issues in pages] == [50, 50, 20]
+
+
+def test_iter_issue_pages_retries_throttled_requests():
+    with ReplayJiraServer(make_issues(100), throttle_first=2, retry_after=0.01) as server:
+        limiter = AdaptiveRateLimiter(initial_delay=0, max_delay=0.05)
+        pages = list(iter_issue_pages(connect(server), "project = SUPPORT", max_results=50,
+                                      concurrency=2, limiter=limiter))
+
+    assert sum(len(issues) for _, issues in pages) == 100
+    assert limiter.throttled == 2
+
+
+def test_iter_updated_pages_keeps_issues_when_one_is_updated_between_pages():
+    with ReplayJiraServer(make_issues(30)) as server:
+        pages = iter_updated_pages(connect(server), "project = SUPPORT ORDER BY created DESC", max_results=10,
+                                   limiter=AdaptiveRateLimiter(initial_delay=0))
+        keys = [issue.key for issue in next(pages)[1]]
+        # An already returned issue is updated mid-run and moves to the end of the results;
+        # with startAt windows SUPPORT-10 would now sit at offset 9 and be skipped
+        server.issues[5]["fields"]["updated"] = "2024-01-02T11:00:00.000+0000"
+        keys += [issue.key for _, issues in pages for issue in issues]
+
+    assert keys[:10] == [f"SUPPORT-{i}" for i in range(10)]
+    assert sorted(keys) == sorted([f"SUPPORT-{i}" for i in range(30)] + ["SUPPORT-5"])
+    assert keys[-1] == "SUPPORT-5"
+
+
+def test_rate_limiter_adapts_delay():
+    limiter = AdaptiveRateLimiter(initial_delay=1.0, min_delay=0.1, max_delay=5.0, target_latency=1.0)
+    limiter.record_success(0.2)
+    assert limiter.delay == pytest.approx(0.8)
+    limiter.record_success(3.0)
+    assert limiter.delay == pytest.approx(1.2)
+    limiter.record_throttle(retry_after=0)
+    assert limiter.delay == pytest.approx(2.4)
+    assert limiter.throttled == 1
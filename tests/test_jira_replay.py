@@ -0,0 +1,150 @@
+from datetime import datetime, timezone
+
+from jira import JIRA
+from pymongo.errors import BulkWriteError
+
+import src.jira_extractor as jira_extractor
+from src.db.mongodb_client import BulkUpsertWriter
+from src.jira_pagination import AdaptiveRateLimiter
+from src.jira_replay import ReplayJiraServer, record_search_pages
+from tests.fake_jira import make_comment_thread, make_issue, make_issues
+
+
+def connect(server):
+    return JIRA(server=server.url, max_retries=0)
+
+
+def test_record_and_replay_round_trip(tmp_path):
+    issues = make_issues(30) + [make_issue(30, comments=5, inline_comments=2)]
+    with ReplayJiraServer(issues, {"SUPPORT-30": make_comment_thread(30, 5)},
+                          throttle_comments_first=1, retry_after=0.01) as live:
+        recorded = record_search_pages(connect(live), "project = SUPPORT", str(tmp_path), page_size=10,
+                                       limiter=AdaptiveRateLimiter(initial_delay=0))
+
+    assert recorded == 31
+    assert live.throttled == 1
+    assert len(list(tmp_path.glob("page-*.json.gz"))) == 4
+    assert (tmp_path / "comments" / "SUPPORT-30.json.gz").exists()
+
+    replay = ReplayJiraServer.from_recording(str(tmp_path))
+    assert [issue["key"] for issue in replay.issues] == [issue["key"] for issue in issues]
+    assert len(replay.comments["SUPPORT-30"]) == 5
+
+
+def test_iter_issues_against_replay_fetches_selected_fields_and_paged_comments():
+    issues = make_issues(20) + [make_issue(20, comments=5, inline_comments=2)]
+    with ReplayJiraServer(issues, {"SUPPORT-20": make_comment_thread(20, 5)}) as server:
+        jira_extractor.set_jira(connect(server))
+        pages = list(jira_extractor.iter_issues("project = SUPPORT", max_results=8, concurrency=2,
+                                                limiter=AdaptiveRateLimiter(initial_delay=0),
+                                                comment_page_size=2))
+
+    extracted = [issue for page in pages for issue in page]
+    assert [len(page) for page in pages] == [8, 8, 5]
+    assert extracted[0]["key"] == "SUPPORT-0"
+    assert extracted[0]["jira_source"] == "project = SUPPORT"
+    assert extracted[0]["cid"] == "cid-1"
+    assert len(extracted[-1]["comments"]) == 5
+    assert "Comment 5: Comment 4 on issue 20" in extracted[-1]["description"]
+
+
+def test_fetch_issue_keys_and_live_key_recheck_against_replay():
+    with ReplayJiraServer(make_issues(25)) as server:
+        jira_extractor.set_jira(connect(server))
+        limiter = AdaptiveRateLimiter(initial_delay=0)
+        keys = jira_extractor.fetch_issue_keys("project = SUPPORT ORDER BY updated DESC", max_results=10,
+                                               concurrency=2, limiter=limiter)
+        live = jira_extractor.fetch_live_keys("project = SUPPORT", ["SUPPORT-3", "SUPPORT-99", "SUPPORT-7"],
+                                              chunk_size=2, limiter=limiter)
+
+    assert keys == {f"SUPPORT-{i}" for i in range(25)}
+    assert live == {"SUPPORT-3", "SUPPORT-7"}
+
+
+def test_issue_comments_retries_throttled_comment_pages():
+    issue_payload = make_issue(0, comments=5, inline_comments=2)
+    with ReplayJiraServer([issue_payload], {"SUPPORT-0": make_comment_thread(0, 5)},
+                          throttle_comments_first=2, retry_after=0.01) as server:
+        jira = connect(server)
+        jira_extractor.set_jira(jira)
+        limiter = AdaptiveRateLimiter(initial_delay=0, max_delay=0.05)
+        issue = jira.search_issues("project = SUPPORT")[0]
+        comments = jira_extractor.issue_comments(issue, limiter, page_size=2)
+
+    assert len(comments) == 5
+    assert limiter.throttled == 2
+
+
+class FailingWriter:
+    """Bulk writer stand-in whose `fail_on`-th flush reports a write error."""
+
+    def __init__(self, fail_on):
+        self.fail_on = fail_on
+        self.flushes = 0
+        self.upserts = []
+        self.totals = {"errors": 0}
+
+    def upsert(self, filter, update):
+        self.upserts.append(filter["key"])
+
+    def flush(self):
+        self.flushes += 1
+        self.totals["errors"] += int(self.flushes == self.fail_on)
+
+
+class StateCollection:
+    def __init__(self):
+        self.watermarks = []
+
+    def update_one(self, query, update, upsert=False):
+        self.watermarks.append(update["$max"]["watermark"])
+
+
+def test_ingest_issues_does_not_advance_watermark_past_failed_writes():
+    with ReplayJiraServer(make_issues(30)) as server:
+        jira_extractor.set_jira(connect(server))
+        state = StateCollection()
+        writer = FailingWriter(fail_on=2)
+        ingested = jira_extractor.ingest_issues("project = SUPPORT", writer, state_collection=state, keyset=True,
+                                                max_results=10, limiter=AdaptiveRateLimiter(initial_delay=0))
+
+    assert writer.flushes == 2
+    assert ingested == 18  # 10 + 9 new issues of the second keyset page, one of which failed
+    assert len(state.watermarks) == 1
+    assert state.watermarks[0].minute == 9
+
+
+class RejectingCollection:
+    name = "issues"
+
+    def bulk_write(self, operations, ordered=True):
+        raise BulkWriteError({"nUpserted": 0, "nModified": 0, "nMatched": 0,
+                              "writeErrors": [{"index": i, "errmsg": "rejected"} for i in range(len(operations))]})
+
+
+def test_ingest_issues_sees_failures_of_interval_flushes():
+    with ReplayJiraServer(make_issues(30)) as server:
+        jira_extractor.set_jira(connect(server))
+        state = StateCollection()
+        # Every upsert flushes on its own, leaving nothing for the flush at the end of the page
+        writer = BulkUpsertWriter(RejectingCollection(), batch_size=500, flush_interval=0)
+        ingested = jira_extractor.ingest_issues("project = SUPPORT", writer, state_collection=state,
+                                                max_results=10, limiter=AdaptiveRateLimiter(initial_delay=0))
+
+    assert ingested == 0
+    assert writer.totals["errors"] == 10
+    assert state.watermarks == []
+
+
+def test_full_ingest_saves_the_run_start_as_watermark_once_complete():
+    with ReplayJiraServer(make_issues(30)) as server:
+        jira_extractor.set_jira(connect(server))
+        state = StateCollection()
+        started = datetime.now(timezone.utc)
+        ingested = jira_extractor.ingest_issues("project = SUPPORT", FailingWriter(fail_on=0), state_collection=state,
+                                                max_results=10, concurrency=3,
+                                                limiter=AdaptiveRateLimiter(initial_delay=0))
+
+    assert ingested == 30
+    assert len(state.watermarks) == 1
+    assert started <= state.watermarks[0] <= datetime.now(timezone.utc)
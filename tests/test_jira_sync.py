@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src.jira_sync import (build_incremental_jql, max_updated, parse_jira_timestamp,
+                           reconcile_deleted_issues, sweep_due)
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+        self.updates = []
+
+    def distinct(self, field, query):
+        return {d[field] for d in self.docs if all(d.get(k) == v for k, v in query.items())}
+
+    def delete_many(self, query):
+        keys = set(query["key"]["$in"])
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not (d["jira_source"] == query["jira_source"] and d["key"] in keys)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update))
+
+
+def test_parse_jira_timestamp_converts_to_utc():
+    assert parse_jira_timestamp("2024-01-02T10:11:12.000+0100") == datetime(2024, 1, 2, 9, 11, 12, tzinfo=timezone.utc)
+    assert parse_jira_timestamp(None) is None
+
+
+def test_max_updated_ignores_unparsable_values():
+    values = ["2024-01-02T10:00:00.000+0000", None, "2024-03-01T08:30:00.000+0200", "garbage"]
+    assert max_updated(values) == datetime(2024, 3, 1, 6, 30, tzinfo=timezone.utc)
+
+
+def test_build_incremental_jql_appends_watermark_and_ordering():
+    watermark = datetime(2024, 3, 1, 6, 30)
+    jql = build_incremental_jql('project = SUPPORT ORDER BY created DESC', watermark,
+                                jira_timezone="Europe/Berlin", overlap_minutes=5)
+    assert jql == '(project = SUPPORT) AND updated >= "2024/03/01 07:25" ORDER BY updated ASC'
+
+
+def test_sweep_due():
+    assert sweep_due({}, 24)
+    assert not sweep_due({"last_sweep": datetime.now(timezone.utc) - timedelta(hours=1)}, 24)
+    assert sweep_due({"last_sweep": datetime.utcnow() - timedelta(hours=25)}, 24)
+
+
+def test_reconcile_deleted_issues_removes_stale_keys_of_the_source():
+    collection = FakeCollection([
+        {"key": "A-1", "jira_source": "q"},
+        {"key": "A-2", "jira_source": "q"},
+        {"key": "A-3", "jira_source": "other"},
+    ])
+    state = FakeCollection()
+    deleted = reconcile_deleted_issues(collection, state, "q", {"A-1"})
+    assert deleted == 1
+    assert {d["key"] for d in collection.docs} == {"A-1", "A-3"}
+    assert "last_sweep" in state.updates[0][1]["$set"]
+
+
+def test_reconcile_deleted_issues_keeps_stale_keys_that_recheck_finds_live():
+    collection = FakeCollection([
+        {"key": "A-1", "jira_source": "q"},
+        {"key": "A-2", "jira_source": "q"},
+        {"key": "A-3", "jira_source": "q"},
+    ])
+    rechecked = []
+
+    def recheck(keys):
+        rechecked.extend(keys)
+        return {"A-2"}
+
+    deleted = reconcile_deleted_issues(collection, FakeCollection(), "q", {"A-1"}, recheck=recheck)
+    assert rechecked == ["A-2", "A-3"]
+    assert deleted == 1
+    assert {d["key"] for d in collection.docs} == {"A-1", "A-2"}
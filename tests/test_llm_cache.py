@@ -0,0 +1,29 @@
+from langchain_core.language_models.fake import FakeListLLM
+from src.llm_cache import SQLiteLRUCache, get_llm_cache
+
+
+def test_cached_llm_reuses_responses_per_parameters(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    llm = FakeListLLM(responses=["first", "second"], cache=get_llm_cache({"model": "a"}, path))
+    assert llm.invoke("prompt") == "first"
+    assert llm.invoke("prompt") == "first"
+    assert llm.invoke("other prompt") == "second"
+
+    other_model = FakeListLLM(responses=["from b"], cache=get_llm_cache({"model": "b"}, path))
+    assert other_model.invoke("prompt") == "from b"
+
+    store = llm.cache.store
+    assert other_model.cache.store is store
+    assert (store.hits, store.misses) == (1, 3)
+
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path):
+    cache = SQLiteLRUCache(str(tmp_path / "llm.sqlite"), max_entries=2)
+    llm = FakeListLLM(responses=["a", "b", "c", "d"], cache=cache)
+    llm.invoke("p1")
+    llm.invoke("p2")
+    llm.invoke("p1")  # Hit; p2 becomes the least recently used
+    llm.invoke("p3")
+    assert len(cache) == 2 and cache.evictions == 1
+    assert llm.invoke("p1") == "a"
+    assert llm.invoke("p2") == "d"
@@ -0,0 +1,139 @@
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+from src.db.mongodb_client import (BulkUpsertWriter, close_mongo_clients, connect_to_mongo, ensure_indexes,
+                                   get_mongo_client, load_collection, report_collscans)
+
+
+class FakeCollection:
+    name = "issues"
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def bulk_write(self, operations, ordered=True):
+        assert ordered is False
+        self.batches.append(operations)
+        if self.fail:
+            raise BulkWriteError({"nUpserted": len(operations) - 1, "nModified": 0, "nMatched": 0,
+                                  "writeErrors": [{"index": 0, "errmsg": "duplicate key"}]})
+        return SimpleNamespace(upserted_count=len(operations), modified_count=0, matched_count=0)
+
+
+def test_bulk_upsert_writer_flushes_by_size_and_on_exit():
+    collection = FakeCollection()
+    with BulkUpsertWriter(collection, batch_size=2, flush_interval=60) as writer:
+        for i in range(5):
+            writer.upsert({"key": f"K-{i}"}, {"$set": {"key": f"K-{i}"}})
+        assert [len(batch) for batch in collection.batches] == [2, 2]
+
+    assert [len(batch) for batch in collection.batches] == [2, 2, 1]
+    assert writer.totals["upserted"] == 5
+    assert collection.batches[0][0]._filter == {"key": "K-0"}
+
+
+def test_bulk_upsert_writer_flushes_stale_buffer():
+    collection = FakeCollection()
+    writer = BulkUpsertWriter(collection, batch_size=100, flush_interval=0)
+    writer.upsert({"key": "K-1"}, {"$set": {"key": "K-1"}})
+    assert len(collection.batches) == 1
+
+
+def test_bulk_upsert_writer_reports_partial_failures():
+    collection = FakeCollection(fail=True)
+    writer = BulkUpsertWriter(collection, batch_size=10)
+    for i in range(3):
+        writer.upsert({"key": f"K-{i}"}, {"$set": {"key": f"K-{i}"}})
+    counts = writer.flush()
+    assert counts == {"upserted": 2, "modified": 0, "matched": 0, "errors": 1}
+    assert writer.flush() == {"upserted": 0, "modified": 0, "matched": 0, "errors": 0}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+        self.fetch_size = None
+
+    def batch_size(self, size):
+        self.fetch_size = size
+        return self
+
+    def __iter__(self):
+        return self.docs
+
+    def __next__(self):
+        return next(self.docs)
+
+
+class FakeQueryCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+        self.cursor = None
+
+    def find(self, query, projection=None):
+        self.calls.append((query, projection))
+        self.cursor = FakeCursor(self.docs)
+        return self.cursor
+
+
+def test_load_collection_applies_projection_and_batch_size():
+    collection = FakeQueryCollection([{"key": "A-1", "description": "x"}])
+    df = load_collection({"issues": collection}, "issues", query={"jira_source": "q"},
+                         projection=["key", "description"], batch_size=50)
+    assert collection.calls == [({"jira_source": "q"}, {"key": 1, "description": 1, "_id": 0})]
+    assert collection.cursor.fetch_size == 50
+    assert list(df.columns) == ["key", "description"]
+
+
+def test_load_collection_yields_chunks():
+    collection = FakeQueryCollection([{"key": f"A-{i}"} for i in range(5)])
+    chunks = list(load_collection({"issues": collection}, "issues", chunksize=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert collection.calls == [({}, None)]
+
+
+class FakeIndexedCollection:
+    def __init__(self, name, plan=None):
+        self.name = name
+        self.indexes = []
+        self.plan = plan or {}
+
+    def create_index(self, keys, **options):
+        self.indexes.append((keys, options))
+        return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+    def find(self, query):
+        return SimpleNamespace(explain=lambda: {"queryPlanner": {"winningPlan": self.plan}})
+
+
+def test_ensure_indexes_creates_configured_indexes():
+    db = {"issues": FakeIndexedCollection("issues")}
+    config = {"mongodb": {"raw_collection": "issues", "indexes": {"raw_collection": [
+        {"fields": {"key": 1}, "unique": True},
+        {"fields": {"jira_source": 1, "updated_date": -1}},
+    ]}}}
+    assert ensure_indexes(db, config) == ["key_1", "jira_source_1_updated_date_-1"]
+    assert db["issues"].indexes[0] == ([("key", 1)], {"unique": True})
+
+
+def test_report_collscans_flags_unindexed_queries():
+    db = {
+        "issues": FakeIndexedCollection("issues", {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}),
+        "processed_data": FakeIndexedCollection("processed_data", {"stage": "COLLSCAN"}),
+    }
+    queries = {"issues": [{"jira_source": "q"}], "processed_data": [{"jira_source": "q"}]}
+    assert report_collscans(db, queries) == [("processed_data", {"jira_source": "q"})]
+
+
+def test_mongo_clients_are_shared_per_uri():
+    options = {"maxPoolSize": 7, "connect": False}
+    try:
+        client = get_mongo_client("mongodb://localhost:27999", options)
+        assert get_mongo_client("mongodb://localhost:27999") is client
+        assert connect_to_mongo("mongodb://localhost:27999", "jira_data").client is client
+        assert client.options.pool_options.max_pool_size == 7
+        assert get_mongo_client("mongodb://localhost:27998", {"connect": False}) is not client
+    finally:
+        close_mongo_clients()
@@ -0,0 +1,18 @@
+import numpy as np
+import pytest
+from src.onnx_embeddings import cosine_drift, mean_pool
+
+
+def test_mean_pool_ignores_padding():
+    hidden = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    assert mean_pool(hidden, mask).tolist() == [[2.0, 3.0]]
+
+
+def test_cosine_drift():
+    reference = np.array([[1.0, 0.0], [0.0, 2.0]])
+    vectors = np.array([[2.0, 0.0], [1.0, 1.0]])
+    report = cosine_drift(vectors, reference)
+    assert report["min_cosine"] == pytest.approx(np.sqrt(0.5))
+    assert report["max_drift"] == pytest.approx(1 - np.sqrt(0.5))
+    assert report["mean_cosine"] == pytest.approx((1 + np.sqrt(0.5)) / 2)
@@ -0,0 +1,46 @@
+from src.output_parser import (INVALID_JSON, MISSING_FIELDS, NO_JSON, TRUNCATED, iter_json_values,
+                               parse_problems)
+
+
+def test_fenced_array_with_trailing_text():
+    output = ('```json\n[{"Problem": "Broker restarts", "Severity": "High", "Impact": "Lost jobs"},\n'
+              ' {"problem": "Slow UI", "severity": "Low", "impact": "Annoyed users"}]\n```\nHope this helps [1].')
+    parsed = parse_problems(output)
+    assert [p["description"] for p in parsed.problems] == ["Broker restarts", "Slow UI"]
+    assert parsed.repairs == [] and parsed.failure is None
+
+
+def test_wrapped_problem_list():
+    parsed = parse_problems('{"problems": [{"Problem": "A", "Severity": "High", "Impact": "B"}]}')
+    assert parsed.problems == [{"description": "A", "severity": "High", "impact": "B"}]
+
+
+def test_malformed_json_is_repaired_locally():
+    output = "{'Problem': 'Token expiry', Severity: 'Medium', 'Impact': 'Logouts',}"
+    parsed = parse_problems(output)
+    assert parsed.problems == [{"description": "Token expiry", "severity": "Medium", "impact": "Logouts"}]
+    assert parsed.repairs == [INVALID_JSON]
+
+
+def test_truncated_json_is_closed():
+    parsed = parse_problems('{"Problem": "Disk full", "Severity": "High", "Impact": "Zeebe stops acc')
+    assert parsed.problems[0]["impact"] == "Zeebe stops acc"
+    assert parsed.repairs == [TRUNCATED]
+
+    values = list(iter_json_values('[{"Problem": "A"}, {"Problem": "B"}, {"Prob'))
+    assert values == [([{"Problem": "A"}, {"Problem": "B"}], TRUNCATED)]
+
+
+def test_text_fallback():
+    output = "Problem: Pods evicted\nSeverity: **High**\nImpact: Workflows stall\n\nProblem: X Severity: Low Impact: Y"
+    assert parse_problems(output).problems == [
+        {"description": "Pods evicted", "severity": "High", "impact": "Workflows stall"},
+        {"description": "X", "severity": "Low", "impact": "Y"},
+    ]
+
+
+def test_failures_are_classified():
+    assert parse_problems("I could not find a problem.").failure == NO_JSON
+    assert parse_problems('{"Summary": "nothing"}').failure == MISSING_FIELDS
+    assert parse_problems('{"Problem": "A" "Severity": "B"}').failure == INVALID_JSON
+    assert parse_problems('{"Problem": {"nested": ').failure == TRUNCATED
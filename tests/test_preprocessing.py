@@ -1,6 +1,6 @@
 import pytest
 import pandas as pd
-from src.preprocessing import clean_text, clean_data, add_metadata
+from src.preprocessing import clean_text, clean_data, clean_series, clean_series_parallel, add_metadata
 
 def test_clean_text():
     raw_text = "Check out our website at http://example.com! It's amazing. :)"
@@ -18,3 +18,19 @@ def test_add_metadata():
     metadata_data = add_metadata(data)
     assert "processed_at" in metadata_data.columns
     assert "customer_id" in metadata_data.columns
+
+def test_clean_series_matches_clean_text():
+    raw_texts = pd.Series([
+        "Check out our website at http://example.com! It's amazing. :)",
+        "Multi\r\n\r\nline\twith\x0bcontrol\x1cchars and   spaces",
+        "Ünïcode text with non breaking spaces and emoji 😀",
+        "www.example.com/path only",
+        "!!!",
+        "",
+        None,
+        42,
+    ], index=[10, 11, 12, 13, 14, 15, 16, 17])
+    expected = [clean_text(text) for text in raw_texts]
+    assert clean_series(raw_texts).tolist() == expected
+    assert clean_series_parallel(raw_texts, workers=2, chunk_size=3).tolist() == expected
+    assert clean_series(raw_texts).index.tolist() == raw_texts.index.tolist()
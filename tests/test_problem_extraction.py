@@ -1,6 +1,8 @@
 # filepath: /c:/Users/Andrey/OneDrive/Documents/GitHub/theburi/issue-extractor/issue-extractor/tests/test_problem_extraction.py
 import pytest
-from src.problem_extraction import parse_llm_output, standardize_problems
+import pandas as pd
+from src.llm_utils import parse_llm_output
+from src.problem_extraction import load_processed_keys, pending_issues, standardize_problems
 
 def test_parse_llm_output():
     llm_output = """
@@ -57,4 +59,35 @@ def test_standardize_problems():
     assert result == expected_result
 
 if __name__ == "__main__":
-    pytest.main()
\ No newline at end of file
+    pytest.main()
+
+
+class FakeProcessedCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection):
+        self.queries.append((query, projection))
+        return self
+
+    def batch_size(self, size):
+        return iter(self.docs)
+
+
+def test_load_processed_keys_fetches_keys_in_one_projected_query():
+    collection = FakeProcessedCollection([{"key": "A-1"}, {"key": "A-2"}])
+    config = {"mongodb": {"processed_collection": "processed"},
+              "issue-extractor": {"jira_source": "q"}, "prompts": {"version": 3}}
+
+    assert load_processed_keys({"processed": collection}, config) == {"A-1", "A-2"}
+    assert collection.queries == [({"jira_source": "q", "version": 3, "problem_type": {"$ne": "unknown"}},
+                                   {"key": 1, "_id": 0})]
+
+
+def test_pending_issues_skips_processed_keys_and_fully_processed_groups():
+    data = pd.DataFrame({"key": ["A-1", "A-2", "A-3"]})
+    assert list(pending_issues(data, {"A-2"})["key"]) == ["A-1", "A-3"]
+
+    grouped = data.assign(duplicate_keys=[["A-1", "A-4"], ["A-2"], ["A-3", "A-5"]])
+    assert list(pending_issues(grouped, {"A-1", "A-2", "A-4", "A-5"})["key"]) == ["A-3"]
@@ -0,0 +1,53 @@
+from src.prompt_budget import PromptBudget, TokenCounter, prompt_token_limit, split_issue_text
+
+ISSUE = ("zeebe brokers restart on aks comments "
+         "comment 1 thanks we will check "
+         "comment 2 the gateway logs show grpc deadline exceeded errors after the helm upgrade to version eight "
+         "comment 3 any update "
+         "comment 4 please share the logs")
+
+
+def test_split_issue_text_follows_comment_numbering():
+    head, comments = split_issue_text("no description comments comment 1 see comment 3 above comment 2 ok")
+    assert head == "no description comments "
+    assert comments == ["comment 1 see comment 3 above", "comment 2 ok"]
+
+
+def test_token_counter_estimates_without_tokenizer():
+    counter = TokenCounter()
+    assert counter.count("abcdefgh") == 2
+    assert counter.truncate("abcdefgh", 1) == "abcd"
+
+
+def test_prompt_token_limit_holds_back_a_margin_for_approximate_counts():
+    counter = TokenCounter()
+    assert prompt_token_limit(counter, {"max_prompt_tokens": 1000}) == 800
+    assert prompt_token_limit(counter, {"max_prompt_tokens": 1000, "safety_margin": 0.1}) == 900
+    counter.exact = True
+    assert prompt_token_limit(counter, {"max_prompt_tokens": 1000}) == 1000
+
+
+def test_fit_issue_text_keeps_head_recent_and_informative_comments():
+    budget = PromptBudget(TokenCounter(), head_tokens=10, recent_comments=1)
+    fitted = budget.fit_issue_text(ISSUE, budget=50)
+    assert fitted.startswith("zeebe brokers restart on aks")
+    assert "comment 2 the gateway logs" in fitted
+    assert "comment 4 please share the logs" in fitted
+    assert "comment 1" not in fitted and "comment 3" not in fitted
+
+
+def test_fit_within_budget_is_unchanged():
+    budget = PromptBudget(TokenCounter(), max_prompt_tokens=1000)
+    text, cases, dropped = budget.fit("Case: {text} Similar: {similar_cases}", ISSUE, ["case a", "case b"])
+    assert (text, cases, dropped) == (ISSUE, "case a\ncase b", 0)
+
+
+def test_fit_trims_similar_cases_and_reports_dropped_tokens():
+    budget = PromptBudget(TokenCounter(), max_prompt_tokens=80, head_tokens=10, similar_cases_share=0.25)
+    cases = ["x" * 40, "y" * 40, "z" * 40]
+    text, similar, dropped = budget.fit("", ISSUE, cases)
+    counter = budget.counter
+    assert counter.count(text) + counter.count(similar) <= 80
+    assert similar.startswith("x" * 40)
+    assert dropped == counter.count(ISSUE) + counter.count("\n".join(cases)) - counter.count(text) - counter.count(similar)
+    assert dropped > 0
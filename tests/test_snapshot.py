@@ -0,0 +1,72 @@
+from src.db.snapshot import load_collection_snapshot, snapshot_key
+
+
+class FakeCursor(list):
+    def batch_size(self, size):
+        return self
+
+    def sort(self, field, direction):
+        return FakeCursor(sorted(self, key=lambda d: d[field], reverse=direction < 0))
+
+    def limit(self, n):
+        return FakeCursor(self[:n])
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.loads = 0
+
+    def count_documents(self, query):
+        return len(self.docs)
+
+    def find(self, query, projection=None):
+        if projection and "key" in projection:  # full load, not the marker lookup
+            self.loads += 1
+        fields = [f for f, v in (projection or {}).items() if v]
+        required = [f for f, v in (query or {}).items() if isinstance(v, dict) and v.get("$exists")]
+        docs = [d for d in self.docs if all(f in d for f in required)]
+        return FakeCursor({f: d[f] for f in fields if f in d} if fields else dict(d) for d in docs)
+
+
+class FakeDb(dict):
+    def command(self, name, collections):
+        return {"collections": {c: str(hash(repr(self[c].docs))) for c in collections}}
+
+
+def test_snapshot_is_reused_until_the_marker_changes(tmp_path):
+    collection = FakeCollection([
+        {"_id": 1, "key": "A-1", "description": "first", "updated_at": "2024-01-01"},
+        {"_id": 2, "key": "A-2", "description": "second", "updated_at": "2024-01-02"},
+    ])
+    db = FakeDb(processed_data=collection)
+    kwargs = dict(query={"jira_source": "q"}, projection=["key", "description"],
+                  directory=str(tmp_path), marker_field="updated_at")
+
+    first = load_collection_snapshot(db, "processed_data", **kwargs)
+    second = load_collection_snapshot(db, "processed_data", **kwargs)
+    assert collection.loads == 1
+    assert second.to_dict("records") == first.to_dict("records")
+
+    collection.docs.append({"_id": 3, "key": "A-3", "description": "third", "updated_at": "2024-01-03"})
+    third = load_collection_snapshot(db, "processed_data", **kwargs)
+    assert collection.loads == 2
+    assert list(third["key"]) == ["A-1", "A-2", "A-3"]
+
+
+def test_snapshot_notices_writes_that_leave_the_marker_field_alone(tmp_path):
+    collection = FakeCollection([{"_id": 1, "key": "A-1", "description": "first"}])
+    db = FakeDb(processed_data=collection)
+    kwargs = dict(projection=["key", "description"], directory=str(tmp_path), marker_field="updated_at")
+
+    load_collection_snapshot(db, "processed_data", **kwargs)
+    collection.docs[0]["description"] = "edited by another script"
+    edited = load_collection_snapshot(db, "processed_data", **kwargs)
+    assert collection.loads == 2
+    assert list(edited["description"]) == ["edited by another script"]
+
+
+def test_snapshot_key_depends_on_query_and_projection():
+    assert snapshot_key("issues", {"a": 1}, ["key"]) == snapshot_key("issues", {"a": 1}, ["key"])
+    assert snapshot_key("issues", {"a": 1}, ["key"]) != snapshot_key("issues", {"a": 2}, ["key"])
+    assert snapshot_key("issues", {"a": 1}, ["key"]) != snapshot_key("issues", {"a": 1}, None)
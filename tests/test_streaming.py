@@ -0,0 +1,67 @@
+from langchain_core.language_models.fake import FakeStreamingListLLM
+from src.llm_cache import get_llm_cache
+from src.streaming import JsonValueScanner, StreamStats, stream_until_complete
+
+ANSWER = 'Sure: {"Problem": "Login {fails}", "Severity": "High"} and some more explanation'
+
+
+def test_scanner_ignores_brackets_in_strings_and_prose():
+    scanner = JsonValueScanner()
+    for chunk in ['Mail [email] me. {"a": "}", ', '"b": [1, 2]', '} tail']:
+        scanner.feed(chunk)
+    assert scanner.values == [{"a": "}", "b": [1, 2]}]
+    assert scanner.text[:scanner.end].endswith("[1, 2]}")
+
+
+def test_stream_stops_once_json_is_complete():
+    llm = FakeStreamingListLLM(responses=[ANSWER])
+    stats = StreamStats(sample_every=0)
+    text = stream_until_complete(llm, "prompt", stats)
+    assert text == 'Sure: {"Problem": "Login {fails}", "Severity": "High"}'
+    # Generation stops at the first prose character after the JSON
+    assert stats.stopped == 1 and stats.tokens == len(text + " a")
+
+
+def test_sampled_call_measures_the_tail():
+    llm = FakeStreamingListLLM(responses=[ANSWER, ANSWER])
+    stats = StreamStats(sample_every=2)
+    assert stream_until_complete(llm, "first", stats) == ANSWER
+    stream_until_complete(llm, "second", stats)
+    tail_tokens, _ = stats.estimated_saving()
+    assert tail_tokens == len("nd some more explanation")
+    assert (stats.calls, stats.sampled, stats.stopped) == (2, 1, 1)
+
+
+def test_stream_keeps_every_object_of_the_json_run():
+    answer = ('```json\n{"Problem": "A"}\n```\n```json\n{"Problem": "B"},\n{"Problem": "C"}\n```\n'
+              'These are the problems.')
+    llm = FakeStreamingListLLM(responses=[answer])
+    stats = StreamStats(sample_every=0)
+    text = stream_until_complete(llm, "prompt", stats)
+    assert text.endswith('{"Problem": "C"}')
+    assert stats.stopped == 1
+
+
+def test_stream_without_prose_after_the_json_runs_to_the_end():
+    llm = FakeStreamingListLLM(responses=['{"Problem": "A"}\n{"Problem": "B"}'])
+    stats = StreamStats(sample_every=0)
+    assert stream_until_complete(llm, "prompt", stats) == '{"Problem": "A"}\n{"Problem": "B"}'
+    assert stats.stopped == 0
+
+
+def test_batch_stream_waits_for_an_object_per_item():
+    answer = ('[{"ID": 1, "Problem": "A"}]\nCase 2 was harder:\n[{"ID": 2, "Problem": "B"}, {"ID": 3, "Problem": "C"}]'
+              '\nDone.')
+    llm = FakeStreamingListLLM(responses=[answer])
+    stats = StreamStats(sample_every=0)
+    text = stream_until_complete(llm, "prompt", stats, max_values=3)
+    assert text.endswith('{"ID": 3, "Problem": "C"}]')
+    assert stats.stopped == 1
+
+
+def test_streamed_results_are_cached(tmp_path):
+    llm = FakeStreamingListLLM(responses=[ANSWER, "{}"], cache=get_llm_cache({"model": "a"}, str(tmp_path / "c")))
+    stats = StreamStats(sample_every=0)
+    first = stream_until_complete(llm, "prompt", stats)
+    assert stream_until_complete(llm, "prompt", stats) == first
+    assert stats.calls == 1
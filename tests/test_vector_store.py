@@ -0,0 +1,106 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import Embeddings
+from src.vector_index import NumpyVectorStore
+from src.vector_store import create_vector_store, normalize_rows, similar_cases_for_keys, top_k_excluding
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded = []
+
+    def _vector(self, text):
+        digest = hashlib.sha1(text.encode()).digest()
+        return [b / 255 for b in digest[:8]]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def test_incremental_vector_store_embeds_only_changed_chunks(tmp_path):
+    documents = pd.DataFrame({"key": ["A-1", "A-2", "A-3"],
+                              "description": ["broker restarts", "gateway timeouts", "operate importer lag"]})
+    embeddings = CountingEmbeddings()
+    store = create_vector_store(documents, embeddings, persist_directory=str(tmp_path))
+    assert sorted(embeddings.embedded) == sorted(documents["description"])
+
+    embeddings.embedded.clear()
+    changed = pd.DataFrame({"key": ["A-1", "A-2", "A-4"],
+                            "description": ["broker restarts", "gateway timeouts after upgrade", "identity login fails"]})
+    store = create_vector_store(changed, embeddings, persist_directory=str(tmp_path))
+    assert sorted(embeddings.embedded) == ["gateway timeouts after upgrade", "identity login fails"]
+
+    stored = store.get(include=["documents", "metadatas"])
+    assert sorted(stored["documents"]) == sorted(changed["description"])
+    assert sorted(m["key"] for m in stored["metadatas"]) == ["A-1", "A-2", "A-4"]
+
+
+def test_rebuild_replaces_store(tmp_path):
+    embeddings = CountingEmbeddings()
+    documents = pd.DataFrame({"key": ["A-1"], "description": ["broker restarts"]})
+    create_vector_store(documents, embeddings, persist_directory=str(tmp_path))
+    store = create_vector_store(documents, embeddings, persist_directory=str(tmp_path), incremental=False)
+    assert embeddings.embedded == ["broker restarts", "broker restarts"]
+    assert store.get(include=[])["ids"] == [store.get(include=[])["ids"][0]]
+
+
+def test_top_k_excluding_skips_own_rows():
+    matrix = normalize_rows(np.array([[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.7, 0.7]]))
+    queries = matrix[[0, 2]]
+    result = top_k_excluding(queries, matrix, [np.array([0]), np.array([2, 3])], k=2)
+    assert [r.tolist() for r in result] == [[1, 3], [1, 0]]
+
+
+def test_similar_cases_for_keys_matches_per_row_search_without_self(tmp_path):
+    documents = pd.DataFrame({"key": ["A-1", "A-2", "A-3", "A-4"],
+                              "description": ["broker restarts", "gateway timeouts", "operate lag", "identity login"]})
+    embeddings = CountingEmbeddings()
+    store = create_vector_store(documents, embeddings, persist_directory=str(tmp_path))
+    embeddings.embedded.clear()
+
+    similar = similar_cases_for_keys(store, ["A-1", "A-3", "missing"], k=2)
+    assert embeddings.embedded == []
+    assert set(similar) == {"A-1", "A-3"}
+    for key, text in [("A-1", "broker restarts"), ("A-3", "operate lag")]:
+        assert text not in similar[key]
+        query = normalize_rows(np.array([embeddings.embed_query(text)]))[0]
+        others = [d for d in documents["description"] if d != text]
+        ranked = sorted(others, key=lambda d: -float(normalize_rows(np.array([embeddings.embed_query(d)]))[0] @ query))
+        assert similar[key] == ranked[:2]
+
+
+def test_numpy_backend_updates_incrementally_and_persists(tmp_path):
+    documents = pd.DataFrame({"key": ["A-1", "A-2", "A-3"],
+                              "description": ["broker restarts", "gateway timeouts", "operate importer lag"]})
+    embeddings = CountingEmbeddings()
+    create_vector_store(documents, embeddings, persist_directory=str(tmp_path), backend="numpy")
+    embeddings.embedded.clear()
+
+    store = create_vector_store(documents.iloc[:2], embeddings, persist_directory=str(tmp_path), backend="numpy")
+    assert embeddings.embedded == []
+    reopened = NumpyVectorStore(embeddings, str(tmp_path / "issues"))
+    assert sorted(reopened.get()["documents"]) == ["broker restarts", "gateway timeouts"]
+    assert reopened.similarity_search("gateway timeouts", k=1)[0].metadata == {"key": "A-2"}
+    assert similar_cases_for_keys(store, ["A-1"], k=3) == {"A-1": ["gateway timeouts"]}
+
+
+def test_numpy_ivf_search_matches_exhaustive_search(tmp_path):
+    texts = [f"chunk {i}" for i in range(400)]
+    embeddings = CountingEmbeddings()
+    exact = NumpyVectorStore(embeddings, str(tmp_path / "exact"))
+    ivf = NumpyVectorStore(embeddings, str(tmp_path / "ivf"), ivf_threshold=100, nprobe=20)
+    exact.add_texts(texts, ids=texts)
+    ivf.add_texts(texts, ids=texts)
+    assert (tmp_path / "ivf" / "centroids.npy").exists()
+    assert len(ivf._centroids) == 20
+
+    ivf_all = NumpyVectorStore(embeddings, str(tmp_path / "ivf"), ivf_threshold=100, nprobe=20)
+    for text in texts[:20]:
+        expected = [d.id for d in exact.similarity_search(text, k=3)]
+        assert [d.id for d in ivf_all.similarity_search(text, k=3)] == expected
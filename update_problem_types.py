@@ -6,7 +6,6 @@ from pathlib import Path
 from typing import List, Dict
 from langchain_core.prompts import PromptTemplate 
 from src.db.mongodb_client import connect_to_mongo, load_collection
-from pymongo import MongoClient
 
 from src.llm_utils import setup_llm
 
@@ -75,8 +74,8 @@ def analyze_description(description, template):
 def update_problem_types(config):
     
     # Connect to MongoDB
-    db = connect_to_mongo(config["mongodb"]["uri"], config["mongodb"]["database"])
-    records = load_collection(db, config["mongodb"]["processed_collection"])
+    db = connect_to_mongo(config["mongodb"]["uri"], config["mongodb"]["database"], config["mongodb"].get("client"))
+    records = load_collection(db, config["mongodb"]["processed_collection"], projection=["description"])
     
     for description in records["description"].tolist():
         new_problem_type = analyze_description(description, config["prompts"]["problem_type"])